@@ -0,0 +1,162 @@
+# anomalies.py
+
+import os
+import json
+import threading
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+
+import config
+from band_store import BandDataStore
+from storage import get_store
+
+
+def anomaly_conditions(entry: dict) -> set:
+    """Stany alarmowe pomiaru: "fall", "hr_low", "hr_high", "spo2_low" (progi z config)."""
+    conditions = set()
+    if entry.get("fall_detected", False):
+        conditions.add("fall")
+    hr = entry.get("heart_rate")
+    if isinstance(hr, (int, float)):
+        if hr < config.HR_MIN:
+            conditions.add("hr_low")
+        elif hr > config.HR_MAX:
+            conditions.add("hr_high")
+    sp = entry.get("spo2")
+    if isinstance(sp, (int, float)) and sp < config.SPO2_MIN:
+        conditions.add("spo2_low")
+    return conditions
+
+
+def is_anomaly(entry: dict) -> bool:
+    """Upadek albo tętno/SpO₂ poza zakresem z config (HR_MIN, HR_MAX, SPO2_MIN)."""
+    return bool(anomaly_conditions(entry))
+
+
+def compact_anomaly(record: dict) -> dict:
+    """Tylko pola istotne dla opiekuna/agenta (mniej tokenów w promptach)."""
+    keys = ("id", "measured_at", "received_at", "heart_rate", "spo2", "fall_detected")
+    return {k: record[k] for k in keys if k in record}
+
+
+class AnomalyIndex:
+    """
+    Indeks anomalii w historii pomiarów.
+
+    Historia opaski się nie zmienia — potwierdzenie anomalii (np. po
+    powiadomieniu opiekuna) to dopisanie linii {"id", "acknowledged_at", "note"}
+    do osobnego dziennika JSON Lines. W pamięci trzymamy tylko niepotwierdzone
+    anomalie (id → rekord) i zbiór potwierdzonych id. Nowe pomiary sprawdzamy
+    przy zapisie (subskrypcja band_store), więc kontrola nie czyta historii.
+
+    Punkt kontrolny (checkpoint_path) zapamiętuje ostatnie przejrzane id i
+    otwarte anomalie; przy starcie skanujemy tylko pomiary zapisane po nim,
+    więc czas startu nie rośnie razem z historią.
+    """
+
+    def __init__(self, store: BandDataStore, ack_path: str, checkpoint_path: Optional[str] = None,
+                 checkpoint_every: int = 500):
+        self.ack_path = ack_path
+        self.checkpoint_every = max(1, checkpoint_every)
+        self._lock = threading.Lock()
+        self._acknowledged = self._load_acks()
+        self._checkpoint = get_store(checkpoint_path, default=dict) if checkpoint_path else None
+        self._open, self._scanned_to = self._load_checkpoint(store)
+        self._unsaved = 0
+        # W trakcie skanu startowego nowe pomiary mogą wyprzedzić skan — punkt kontrolny dopiero po nim
+        self._scanning = True
+
+        # Najpierw subskrypcja, potem skan — pomiary zapisane w trakcie skanu też trafią do indeksu
+        store.subscribe(self._on_records)
+        self._on_records(store.iter_after(self._scanned_to))
+        self._scanning = False
+        self._save_checkpoint()
+
+    def _load_checkpoint(self, store: BandDataStore) -> tuple:
+        if self._checkpoint is None:
+            return {}, -1
+        state = self._checkpoint.read()
+        scanned_to = state.get("scanned_to", -1)
+        last = store.last()
+        # Punkt kontrolny z innej (np. wyczyszczonej) historii — skanujemy od początku
+        if not isinstance(scanned_to, int) or last is None or last.get("id", -1) < scanned_to:
+            return {}, -1
+        open_records = {
+            r["id"]: r for r in state.get("open", [])
+            if isinstance(r, dict) and "id" in r and r["id"] not in self._acknowledged
+        }
+        return open_records, scanned_to
+
+    def _save_checkpoint(self) -> None:
+        if self._checkpoint is None:
+            return
+        with self._lock:
+            self._unsaved = 0
+            state = {
+                "scanned_to": self._scanned_to,
+                "open": sorted(self._open.values(), key=lambda r: r["id"]),
+            }
+            self._checkpoint.write(state)
+
+    def _load_acks(self) -> set:
+        acknowledged = set()
+        if not os.path.exists(self.ack_path):
+            return acknowledged
+        with open(self.ack_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    acknowledged.add(json.loads(line)["id"])
+                except (ValueError, KeyError, TypeError):
+                    continue  # np. niedokończona ostatnia linia
+        return acknowledged
+
+    def _on_records(self, records: Iterable[dict]) -> None:
+        found = []
+        count = 0
+        last_id = -1
+        for record in records:
+            count += 1
+            last_id = max(last_id, record.get("id", -1))
+            if is_anomaly(record):
+                found.append(record)
+        with self._lock:
+            for record in found:
+                if record.get("id") not in self._acknowledged:
+                    self._open[record["id"]] = record
+            self._scanned_to = max(self._scanned_to, last_id)
+            self._unsaved += count
+            due = not self._scanning and self._unsaved >= self.checkpoint_every
+        if due:
+            self._save_checkpoint()
+
+    def unacknowledged(self) -> list:
+        """Niepotwierdzone anomalie, od najstarszej."""
+        with self._lock:
+            return sorted(self._open.values(), key=lambda r: r["id"])
+
+    def is_acknowledged(self, record_id) -> bool:
+        with self._lock:
+            return record_id in self._acknowledged
+
+    def acknowledge(self, ids: Optional[Iterable[int]] = None, note: str = "") -> int:
+        """
+        Potwierdza podane anomalie (domyślnie wszystkie niepotwierdzone).
+        Zwraca liczbę nowo potwierdzonych.
+        """
+        now = datetime.now(timezone.utc).isoformat()
+        with self._lock:
+            targets = list(self._open) if ids is None else [i for i in ids if i in self._open]
+            if not targets:
+                return 0
+            lines = "".join(
+                json.dumps({"id": i, "acknowledged_at": now, "note": note}, ensure_ascii=False) + "\n"
+                for i in targets
+            )
+            with open(self.ack_path, "a", encoding="utf-8") as f:
+                f.write(lines)
+            for i in targets:
+                self._acknowledged.add(i)
+                del self._open[i]
+        self._save_checkpoint()
+        return len(targets)
+
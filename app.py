@@ -1,119 +1,61 @@
 # app.py
 
-from flask import Flask, jsonify, request, render_template
-import io
-import os
-import asyncio
+from flask import Flask, Response, jsonify, request, render_template, stream_with_context
+import base64
+import functools
+import logging
 import numpy as np
-import soundfile as sf
-from dateutil import parser
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from openai import OpenAI
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timezone
 
 from flask_cors import CORS
 from dotenv import load_dotenv
 
 import config
 import time
-import ffmpeg
 import json
 import random
-import notifications
-
-from audio_handler import handle_audio
-from voice_agents import voice_handler
-# ——————————————————————————————————————————————————————————
-# Inicjalizacja klienta OpenAI
-# ——————————————————————————————————————————————————————————
-client = OpenAI(api_key=config.OPENAI_API_KEY)
-
-# ——————————————————————————————————————————————————————————
-# Funkcje pomocnicze
-# ——————————————————————————————————————————————————————————
-
-def get_calendar_service():
-    creds = None
-    if os.path.exists(config.GOOGLE_TOKEN_FILE):
-        creds = Credentials.from_authorized_user_file(config.GOOGLE_TOKEN_FILE, config.SCOPES)
-    if not creds or not creds.valid:
-        flow = InstalledAppFlow.from_client_secrets_file(config.GOOGLE_CREDENTIALS_FILE, config.SCOPES)
-        creds = flow.run_local_server(port=0)
-        with open(config.GOOGLE_TOKEN_FILE, 'w') as token:
-            token.write(creds.to_json())
-    return build('calendar', 'v3', credentials=creds)
-
-def generate_event_message(summary: str, start: str) -> str:
-    prompt = (
-    f"Create a short, friendly reminder for the event '{summary}', "
-    f"which will take place on {start}."
-)
-    resp = client.chat.completions.create(
-        model=config.OPENAI_CHAT_MODEL_CALENDAR,
-        messages=[
-            {"role": "system", "content": "You are a helpful assistant for old people."},
-            {'role': 'user', 'content': prompt}
-        ]
-    )
-    return resp.choices[0].message.content.strip()
+import async_runtime
+import residents
+
+from band_store import validate_band_record
+from residents import current_resident
+from reminders import get_reminders
+from reminder_scheduler import reminder_scheduler
+
+from audio_handler import handle_audio, stream_pcm
+from audio_decode import decode_upload
+from vad import trim_silence
+from voice_queue import QueueFull, VoiceJob, voice_queue
+from stream_slots import stream_slots
+from voice_agents import voice_handler, voice_handler_stream
+import voice_session
+
+# ==========================================================
 
+app = Flask(__name__, static_folder="static", static_url_path="/static")
+CORS(app)
 
-def parse_datetime(dt_str: str) -> datetime:
-    return parser.isoparse(dt_str)
+# Bez treści rozmów i pomiarów — tylko id, czasy i liczby
+log = logging.getLogger(__name__)
 
-# ——————————————————————————————————————————————————————————
-# Zadanie cykliczne
-# ——————————————————————————————————————————————————————————
 
-def fetch_next_reminders(count: int = 1):
+@app.before_request
+def _activate_resident():
     """
-    Pobiera `count` najbliższych wydarzeń z Google Calendar w horyzoncie najbliższych 10 dni.
-    Zwraca listę słowników: {summary, start, message }.
-    Jeśli nie ma żadnych wydarzeń, zwraca pustą listę.
+    Podopieczny żądania: nagłówek X-Resident-Id albo ?resident=<id> (domyślnie
+    DEFAULT_RESIDENT_ID). Nieznany podopieczny dostaje 404, a proces obsługujący
+    tylko część podopiecznych (WORKER_RESIDENTS / WORKER_SHARD) odsyła
+    pozostałych z kodem 421.
     """
-    service = get_calendar_service()
-    now = datetime.utcnow().replace(tzinfo=timezone.utc)
-    now_iso = now.isoformat()
-    until_iso = (now + timedelta(days=10)).isoformat()
-
-    # Pobieramy `count` najbliższych wydarzeń
-    events_result = service.events().list(
-        calendarId=config.CALENDAR_ID,
-        timeMin=now_iso,
-        timeMax=until_iso,
-        singleEvents=True,
-        orderBy='startTime',
-        maxResults=count
-    ).execute()
-    items = events_result.get('items', [])
-    print(f"Fetched {len(items)} events.")
-
-    reminders = []
-    for ev in items:
-        summary   = ev.get('summary', '(Brak tytułu)')
-        start_str = ev['start'].get('dateTime', ev['start'].get('date'))
-        
-        print(f"Event: {summary} at {start_str}")
-        # Generujemy tekst i audio
-        text = generate_event_message(summary, start_str)
-        print(f"Generated message: {text}")
-        #audio_b64 = handle_audio(text)
-
-        reminders.append({
-            "summary": summary,
-            "start":   start_str,
-            "message": text
-        })
-
-    return reminders
-
-
-# ==========================================================
+    resident_id = request.headers.get("X-Resident-Id") or request.args.get("resident") or config.DEFAULT_RESIDENT_ID
+    if not residents.is_valid_id(resident_id):
+        return jsonify({"error": "Nieprawidłowy identyfikator podopiecznego"}), 400
+    if not residents.is_known(resident_id):
+        return jsonify({"error": f"Nieznany podopieczny: {resident_id}"}), 404
+    if not residents.is_served_here(resident_id):
+        return jsonify({"error": f"Podopieczny {resident_id} jest obsługiwany przez inny proces"}), 421
+    residents.activate(resident_id)
 
-app = Flask(__name__, static_folder="static", static_url_path="/static")
-CORS(app)
 
 @app.route("/api/tts", methods=["POST"])
 def api_tts():
@@ -129,83 +71,135 @@ def api_tts():
     return "", 200
 
 
-@app.route("/api/voice", methods=["POST"])
-def api_voice():
-    audio_bytes = request.data
-
-    # 2) Zapisz oryginał (do ręcznej inspekcji)
-    ts = int(time.time())
-    webm_path = os.path.join("uploads", f"rec_{ts}.webm")
-    with open(webm_path, "wb") as f:
-        f.write(audio_bytes)
-
-    # 3) Konwersja WebM→WAV PCM16 24 kHz Mono
-    in_buf = io.BytesIO(audio_bytes)
-    wav_buf = io.BytesIO()
-
-    out, err = (
-        ffmpeg
-        .input("pipe:0")
-        .output(
-            "pipe:1",
-            format="wav",
-            acodec="pcm_s16le",
-            ac=1,
-            ar="24000"
-        )
-        .run(
-            capture_stdout=True,
-            capture_stderr=True,
-            input=in_buf.read(),
-            overwrite_output=True
-        )
+@app.route("/api/tts/stream", methods=["POST"])
+def api_tts_stream():
+    """
+    Strumieniuje mowę do przeglądarki jako surowy PCM (int16, 24 kHz, mono)
+    w odpowiedzi chunked — odtwarzanie może ruszyć po pierwszym kawałku.
+    """
+    text = (request.get_json(silent=True) or {}).get("text")
+    if not text:
+        return jsonify({"error": "Brak tekstu do przetworzenia"}), 400
+
+    return Response(
+        stream_with_context(stream_pcm(text)),
+        mimetype="audio/pcm",
+        headers={
+            "X-Sample-Rate": "24000",
+            "X-Channels": "1",
+            "Cache-Control": "no-cache",
+        },
     )
-    # teraz 'out' to bajty z przekonwertowanym WAV-em
-    wav_buf.write(out)
-    wav_buf.seek(0)
 
-    # 4) Wczytaj WAV do numpy
-    try:
-        audio_np, sr = sf.read(wav_buf, dtype="int16")
-    except Exception as e:
-        return jsonify({"error": f"Niepoprawny WAV po konwersji: {e}"}), 400
 
-    # 5) Wywołaj Twój async handler — teraz podajesz KORUTYNĘ!
-    try:
-        ret = asyncio.run(voice_handler(audio_np))
-    except Exception as e:
-        return jsonify({"error": f"Handler wyrzucił wyjątek: {e}"}), 500
+def _decode_voice_upload() -> np.ndarray:
+    """
+    Zamienia nagranie z body żądania na PCM16 24 kHz mono (numpy):
+    surowy PCM z przeglądarki (audio/pcm) bez transkodowania, WebM przez dekoder.
+    """
+    return decode_upload(request.get_data(), request.mimetype, request.mimetype_params)
 
-    # 6) Zwróć status OK
-    print(f"Received: {ret}")
 
-    # Przygotuj dane do zapisania
-    data_to_save = {
+def _save_transcript(ret: dict) -> None:
+    resident = current_resident()
+    resident.transcripts.append({
         "timestamp": datetime.now(timezone.utc).isoformat(),
         "output_transcript": ret.get('output_transcript', ''),
         "input_transcript": ret.get('input_transcript', ''),
-    }
+    })
+    # Streszczenie starszych tur aktualizuje się w tle, poza ścieżką odpowiedzi
+    resident.memory.schedule_update()
 
-    # Wczytaj istniejące dane lub stwórz pustą listę
-    if os.path.exists(config.TRANSCRIPT_HISTORY_FILE):
-        with open(config.TRANSCRIPT_HISTORY_FILE, "r", encoding="utf-8") as f:
-            try:
-                existing_data = json.load(f)
-                if not isinstance(existing_data, list):
-                    existing_data = []
-            except json.JSONDecodeError:
-                existing_data = []
-    else:
-        existing_data = []
 
-    # Dodaj nowe dane
-    existing_data.append(data_to_save)
+def _run_voice_turn(audio_np: np.ndarray, vad_stats: dict, job: VoiceJob) -> dict:
+    """Tura w wątku kolejki — wynik (transkrypcja) trafia do job.result."""
+    turn_started = time.perf_counter()
+    ret = async_runtime.run(voice_handler(audio_np))
+    log.debug("Voice turn done in %.2f s (resident %s)", time.perf_counter() - turn_started, current_resident().id)
+    _save_transcript(ret)
+    return {**ret, "vad": vad_stats} if vad_stats else ret
+
 
-    # Zapisz całą listę z powrotem do pliku
-    with open(config.TRANSCRIPT_HISTORY_FILE, "w", encoding="utf-8") as f:
-        json.dump(existing_data, f, ensure_ascii=False, indent=2)
+def _run_voice_turn_stream(audio_np: np.ndarray, vad_stats: dict, job: VoiceJob) -> None:
+    """
+    Tura w wątku kolejki dla ?stream=1: kawałki audio odpowiedzi (PCM int16
+    24 kHz, Base64) i na końcu transkrypcja trafiają do job.events(), gdy
+    tylko powstaną. Tura kończy się (i zapisuje) także po rozłączeniu klienta.
+    """
+    turn_started = time.perf_counter()
+    for event in async_runtime.iterate(voice_handler_stream(audio_np)):
+        if event["type"] == "audio":
+            pcm = np.asarray(event["data"], dtype=np.int16).tobytes()
+            job.emit({"type": "audio", "data": base64.b64encode(pcm).decode("ascii")})
+        else:
+            log.debug("Voice turn done in %.2f s (resident %s)", time.perf_counter() - turn_started, current_resident().id)
+            _save_transcript(event)
+            job.emit({**event, "vad": vad_stats} if vad_stats else event)
 
-    return jsonify(ret), 200
+
+def _stream_voice_job(job: VoiceJob):
+    """Odpowiedź NDJSON ze zdarzeń tury wykonywanej w kolejce."""
+    for line in job.events():
+        yield json.dumps(line, ensure_ascii=False) + "\n"
+    if job.status == "error":
+        yield json.dumps({"type": "error", "error": f"Handler wyrzucił wyjątek: {job.error}"}, ensure_ascii=False) + "\n"
+
+
+@app.route("/api/voice", methods=["POST"])
+def api_voice():
+    try:
+        audio_np = _decode_voice_upload()
+    except Exception as e:
+        return jsonify({"error": f"Nie udało się zdekodować nagrania: {e}"}), 400
+
+    # Wycinamy ciszę przed transkrypcją — krótsze nagranie to szybsze i tańsze STT
+    vad_stats = None
+    if config.VAD_ENABLED:
+        audio_np, vad_stats = trim_silence(audio_np)
+        print(f"VAD: {vad_stats}")
+        if not vad_stats["speech_detected"]:
+            return jsonify({"error": "Nie wykryto mowy w nagraniu", "vad": vad_stats}), 400
+
+    # ?async=1 — od razu 202 z adresem zadania; ?stream=1 — audio odpowiedzi trafia do klienta
+    run_async = request.args.get("async", type=int)
+    stream = request.args.get("stream", type=int) and not run_async
+    turn = _run_voice_turn_stream if stream else _run_voice_turn
+
+    # Tura wykonuje się w puli kolejki, nie w wątku serwera; przy pełnej kolejce — 429
+    try:
+        job = voice_queue.submit(functools.partial(turn, audio_np, vad_stats), current_resident().id)
+    except QueueFull as e:
+        return jsonify({
+            "error": "Asystent prowadzi teraz inne rozmowy — spróbuj ponownie za chwilę",
+            "retry_after": e.retry_after,
+            "queue": voice_queue.stats(),
+        }), 429, {"Retry-After": str(e.retry_after)}
+
+    if run_async:
+        status_url = f"/api/voice/jobs/{job.id}"
+        return jsonify({**voice_queue.describe(job), "status_url": status_url}), 202, {"Location": status_url}
+
+    if stream:
+        return Response(_stream_voice_job(job), mimetype="application/x-ndjson")
+
+    job.wait()
+    if job.status == "error":
+        return jsonify({"error": f"Handler wyrzucił wyjątek: {job.error}"}), 500
+    return jsonify(job.result), 200
+
+
+@app.route("/api/voice/jobs/<job_id>", methods=["GET"])
+def api_voice_job(job_id):
+    """Stan tury zleconej z ?async=1: 202 w kolejce/w trakcie, 200 z wynikiem, 500 po błędzie."""
+    job = voice_queue.get(job_id)
+    if job is None or job.resident_id != current_resident().id:
+        return jsonify({"error": "Nie znaleziono zadania"}), 404
+    info = voice_queue.describe(job)
+    if job.status == "done":
+        return jsonify(info), 200
+    if job.status == "error":
+        return jsonify(info), 500
+    return jsonify(info), 202
 
 
 @app.route('/api/reminders', methods=['GET'])
@@ -213,56 +207,101 @@ def api_get_reminders():
     n = request.args.get('n', default=1, type=int)
     if n < 1:
         n = 1
-    reminders = fetch_next_reminders(count=n)
+    calendar = current_resident().calendar
+    if calendar is None:
+        return jsonify([]), 200
+    reminders = get_reminders(count=n, calendar=calendar)
     return jsonify(reminders), 200
 
 
+def _parse_ndjson_body() -> list:
+    """
+    Odczytuje strumieniowo body NDJSON (jeden obiekt JSON na linię).
+    Zwraca listę par (rekord, błąd) — dla niepoprawnych linii rekord to None.
+    """
+    parsed = []
+    for raw_line in request.stream:
+        line = raw_line.strip()
+        if not line:
+            continue
+        try:
+            parsed.append((json.loads(line), None))
+        except json.JSONDecodeError as e:
+            parsed.append((None, f"Niepoprawny JSON: {e}"))
+    return parsed
+
+
+def _ingest_band_batch(parsed: list):
+    """Zapisuje paczkę pomiarów i zwraca status dla każdego rekordu."""
+    # 1) Walidacja i znakowanie czasem odbioru każdego rekordu osobno;
+    #    czas pomiaru z bramki (measured_at) zostaje bez zmian
+    received_at = datetime.utcnow().isoformat() + "Z"
+    results = []
+    valid = []
+    for index, (record, error) in enumerate(parsed):
+        error = error or validate_band_record(record)
+        if error:
+            results.append({"index": index, "status": "error", "error": error})
+            continue
+        results.append({"index": index, "status": "OK"})
+        valid.append((index, {**record, "received_at": received_at}))
+
+    # 2) Cała paczka poprawnych rekordów trafia do historii jednym zapisem
+    try:
+        stored = current_resident().band_store.append_many(entry for _, entry in valid)
+    except OSError as e:
+        return jsonify({"error": f"Nie udało się zapisać historii: {e}"}), 500
+
+    for (index, _), entry in zip(valid, stored):
+        results[index]["id"] = entry["id"]
+
+    print(f"Saved {len(stored)} band entries ({len(results) - len(stored)} rejected)")
+    status_code = 200 if stored or not results else 400
+    return jsonify({
+        "status": "OK" if len(stored) == len(results) else "PARTIAL",
+        "accepted": len(stored),
+        "rejected": len(results) - len(stored),
+        "results": results,
+    }), status_code
+
+
 @app.route("/api/band_data", methods=["POST"])
 def api_band_data():
+    # Paczka pomiarów z bramki w formacie NDJSON
+    if request.mimetype == "application/x-ndjson":
+        return _ingest_band_batch(_parse_ndjson_body())
+
     # 1) Wczytaj JSON z body (force=True, jeśli nagłówek nie jest ustawiony)
     try:
         data = request.get_json(force=True)
     except Exception as e:
         return jsonify({"error": f"Niepoprawny JSON: {e}"}), 400
 
-    # 2) Wczytaj istniejącą historię, albo zainicjuj pustą listę
-    history = []
-    history_file = config.HISTORY_BAND_DATA_FILE
+    # Paczka pomiarów z bramki jako tablica JSON
+    if isinstance(data, list):
+        return _ingest_band_batch([(record, None) for record in data])
 
-    if os.path.exists(history_file):
-        try:
-            with open(history_file, "r", encoding="utf-8") as f:
-                history = json.load(f)
-                if not isinstance(history, list):
-                    history = []
-        except json.JSONDecodeError:
-            history = []
-
-    # 3) Dodaj nowy wpis
-    entry = {
-        "received_at": datetime.datetime.utcnow().isoformat() + "Z",
-        "data":        data
-    }
-    history.append(entry)
+    error = validate_band_record(data)
+    if error:
+        return jsonify({"error": error}), 400
+
+    # 2) Dopisz nowy wpis na końcu historii (bez wczytywania całego pliku)
+    entry = {**data, "received_at": datetime.utcnow().isoformat() + "Z"}
 
     try:
-        with open(history_file, "w", encoding="utf-8") as f:
-            json.dump(history, f, ensure_ascii=False, indent=2)
-    except Exception as e:
+        entry = current_resident().band_store.append(entry)
+    except OSError as e:
         return jsonify({"error": f"Nie udało się zapisać historii: {e}"}), 500
 
-    print(f"Saved band entry: {entry}")
+    log.debug("Saved band entry %s (resident %s)", entry["id"], current_resident().id)
     return jsonify({"status": "OK"}), 200
 
 
 @app.route('/api/inject_anomaly', methods=['POST'])
 def inject_anomaly():
-    # Wczytaj historię
-    with open(config.HISTORY_BAND_DATA_FILE, 'r', encoding='utf-8') as f:
-        history = json.load(f)
-
     # Wygeneruj anomalny wpis na podstawie ostatniego pomiaru lub całkowicie nowy
-    last = history[-1] if history else {}
+    store = current_resident().band_store
+    last = store.last() or {}
     new_entry = {
         "received_at": datetime.utcnow().isoformat() + "Z",
         "heart_rate": last.get('heart_rate', 80),
@@ -282,46 +321,84 @@ def inject_anomaly():
         new_entry['fall_detected'] = True
 
     # Dodaj do historii
-    history.append({"received_at": new_entry['received_at'], "heart_rate": new_entry['heart_rate'], "spo2": new_entry['spo2'], "battery": new_entry['battery'], "fall_detected": new_entry['fall_detected']})
-    with open(config.HISTORY_BAND_DATA_FILE, 'w', encoding='utf-8') as f:
-        json.dump(history, f, ensure_ascii=False, indent=2)
+    new_entry = store.append(new_entry)
 
     return jsonify(new_entry), 200
 
 
+def _notification_cursor() -> int:
+    """Kursor klienta: ?since=<id> albo nagłówek Last-Event-ID (ponowne połączenie EventSource)."""
+    cursor = request.args.get("since", type=int)
+    if cursor is None:
+        cursor = request.headers.get("Last-Event-ID", type=int)
+    return cursor or 0
+
+
 @app.route('/api/notifications', methods=['GET'])
 def api_notifications():
     """
-    Zwraca listę wszystkich powiadomień zapisanych w config.NOTIFICATION_HISTORY_FILE.
+    Zwraca powiadomienia nowsze niż ?since=<id> (domyślnie wszystkie).
+    Odczyt niczego nie usuwa — kilku klientów może czytać tę samą historię.
     """
-    path = config.NOTIFICATION_HISTORY_FILE
-    if not os.path.exists(path):
-        return jsonify([]), 200
-
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            notifications_list = json.load(f)
-            if not isinstance(notifications_list, list):
-                notifications_list = []
-    except Exception:
-        notifications_list = []
+    return jsonify(current_resident().notifications.since(_notification_cursor())), 200
 
-    if os.path.exists(config.NOTIFICATION_HISTORY_FILE):
-        os.remove(config.NOTIFICATION_HISTORY_FILE)
 
-    return jsonify(notifications_list), 200
+@app.route('/api/notifications/stream', methods=['GET'])
+def api_notifications_stream():
+    """
+    Strumień powiadomień (Server-Sent Events). Najpierw zaległe wpisy od kursora,
+    potem każdy nowy wpis, gdy tylko powstanie. Pole "id" każdego zdarzenia
+    przeglądarka odsyła jako Last-Event-ID po zerwaniu połączenia.
+    """
+    # Strumień zajmuje wątek serwera — ponad limit klient przechodzi na odpytywanie
+    if not stream_slots.acquire():
+        return jsonify({"error": "Zbyt wiele otwartych strumieni — użyj /api/notifications?since=<id>"}), 503, {"Retry-After": "30"}
+
+    cursor = _notification_cursor()
+    feed = current_resident().notifications
+
+    def generate():
+        nonlocal cursor
+        yield "retry: 3000\n\n"
+        pending = feed.since(cursor)
+        while True:
+            for entry in pending:
+                cursor = entry["id"]
+                yield f"id: {cursor}\nevent: notification\ndata: {json.dumps(entry, ensure_ascii=False)}\n\n"
+            if not pending:
+                yield ": keep-alive\n\n"
+            pending = feed.wait(cursor, config.NOTIFICATION_STREAM_KEEPALIVE_SECONDS)
+
+    response = Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    # call_on_close działa także wtedy, gdy generator nigdy nie wystartował
+    response.call_on_close(stream_slots.release)
+    return response
 
 
 @app.route("/", methods=["GET"])
 def index():
-    if os.path.exists(config.TRANSCRIPT_HISTORY_FILE):
-        os.remove(config.TRANSCRIPT_HISTORY_FILE)
+    resident = current_resident()
+    resident.transcripts.clear()
+    resident.memory.clear()
+    resident.notifications.clear()
+
+    return render_template(
+        "index.html",
+        resident_id=resident.id,
+        stream_voice=not config.PLAY_ON_BACKEND,
+        voice_session=config.VOICE_SESSION_ENABLED and not config.PLAY_ON_BACKEND,
+    )
 
-    if os.path.exists(config.NOTIFICATION_HISTORY_FILE):
-        os.remove(config.NOTIFICATION_HISTORY_FILE)
 
-    return render_template("index.html")
+# Sesja głosowa na żywo (WebSocket) — transkrypcje trafiają do tej samej historii
+socketio = voice_session.init_app(app, on_transcript=_save_transcript)
 
 if __name__ == '__main__':
     load_dotenv()
-    app.run(host='0.0.0.0', port=5000)
+    if config.REMINDER_SCHEDULER_ENABLED:
+        reminder_scheduler.start()
+    socketio.run(app, host='0.0.0.0', port=5000, allow_unsafe_werkzeug=True)
@@ -0,0 +1,65 @@
+# async_runtime.py
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, AsyncIterator, Coroutine, Iterator, Optional
+
+from openai import AsyncOpenAI
+
+import config
+
+# ——————————————————————————————————————————————————————————
+# Jedna, stale działająca pętla asyncio w wątku w tle
+# ——————————————————————————————————————————————————————————
+# Trasy Flaska (synchroniczne) zlecają do niej korutyny zamiast wołać
+# asyncio.run() przy każdym żądaniu. Dzięki temu pula połączeń HTTP
+# klienta AsyncOpenAI (keep-alive, TLS) przeżywa między kolejnymi turami.
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+# Wspólny, długo żyjący klient — używany przez TTS i pipeline głosowy.
+# Jego połączenia należą do pętli poniżej, więc używamy go tylko w niej.
+async_openai = AsyncOpenAI(api_key=config.OPENAI_API_KEY)
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Zwraca pętlę działającą w tle (tworzy ją przy pierwszym użyciu)."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=_loop.run_forever, name="async-runtime", daemon=True)
+            thread.start()
+    return _loop
+
+
+def submit(coro: Coroutine[Any, Any, Any]) -> Future:
+    """Zleca korutynę pętli w tle i zwraca concurrent.futures.Future."""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+
+def run(coro: Coroutine[Any, Any, Any], timeout: Optional[float] = None) -> Any:
+    """Synchroniczny odpowiednik asyncio.run() — czeka na wynik korutyny z pętli w tle."""
+    return submit(coro).result(timeout)
+
+
+def iterate(agen: AsyncIterator[Any]) -> Iterator[Any]:
+    """
+    Synchroniczny iterator po asynchronicznym generatorze działającym w pętli w tle
+    (np. do strumieniowania odpowiedzi Flaska). Przerwanie iteracji zamyka generator.
+    """
+    async def _next():
+        return await agen.__anext__()
+
+    try:
+        while True:
+            try:
+                yield run(_next())
+            except StopAsyncIteration:
+                return
+    finally:
+        aclose = getattr(agen, "aclose", None)
+        if aclose is not None:
+            run(aclose())
@@ -0,0 +1,121 @@
+# audio_decode.py
+
+import io
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import ffmpeg
+import numpy as np
+
+import config
+
+# PyAV (w requirments.txt) dekoduje WebM/Opus w procesie, bez uruchamiania ffmpeg;
+# bez niego wracamy do ffmpeg jako podprocesu
+try:
+    import av
+except ImportError:
+    av = None
+
+SAMPLE_RATE = 24000
+MAX_SAMPLE_RATE = 192000
+
+# Archiwizacja nagrań nie blokuje obsługi żądania
+_archive_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="upload-archive")
+
+
+def _write_upload(audio_bytes: bytes, path: str) -> None:
+    try:
+        with open(path, "wb") as f:
+            f.write(audio_bytes)
+    except OSError as e:
+        print(f"Nie udało się zarchiwizować nagrania {path}: {e}")
+
+
+def archive_upload(audio_bytes: bytes, extension: str = "webm") -> None:
+    """Zapisuje oryginalne nagranie w tle (do ręcznej inspekcji), jeśli włączono ARCHIVE_UPLOADS."""
+    if not config.ARCHIVE_UPLOADS:
+        return
+    path = os.path.join(config.UPLOADS_DIR, f"rec_{time.time_ns()}.{extension}")
+    _archive_pool.submit(_write_upload, audio_bytes, path)
+
+
+def _decode_with_pyav(audio_bytes: bytes) -> np.ndarray:
+    resampler = av.AudioResampler(format="s16", layout="mono", rate=SAMPLE_RATE)
+    chunks = []
+    with av.open(io.BytesIO(audio_bytes), mode="r") as container:
+        for frame in container.decode(audio=0):
+            for out in resampler.resample(frame):
+                chunks.append(out.to_ndarray().reshape(-1))
+        for out in resampler.resample(None):
+            chunks.append(out.to_ndarray().reshape(-1))
+    if not chunks:
+        return np.zeros(0, dtype=np.int16)
+    return np.concatenate(chunks).astype(np.int16, copy=False)
+
+
+def _decode_with_ffmpeg(audio_bytes: bytes) -> np.ndarray:
+    # Surowe s16le zamiast WAV — bajty trafiają prosto do numpy, bez parsowania nagłówka
+    out, _ = (
+        ffmpeg
+        .input("pipe:0")
+        .output("pipe:1", format="s16le", acodec="pcm_s16le", ac=1, ar=str(SAMPLE_RATE))
+        .run(capture_stdout=True, capture_stderr=True, input=audio_bytes)
+    )
+    return np.frombuffer(out, dtype="<i2").astype(np.int16, copy=False)
+
+
+def parse_sample_rate(value) -> int:
+    """Częstotliwość próbkowania od klienta; ValueError, jeśli nie jest dodatnią liczbą całkowitą."""
+    try:
+        rate = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Nieprawidłowa częstotliwość próbkowania: {value!r}")
+    if not 0 < rate <= MAX_SAMPLE_RATE:
+        raise ValueError(f"Nieprawidłowa częstotliwość próbkowania: {rate}")
+    return rate
+
+
+def decode_raw_pcm(audio_bytes: bytes, sample_rate: int = SAMPLE_RATE, big_endian: bool = False) -> np.ndarray:
+    """
+    Surowy PCM int16 mono nagrany w przeglądarce — bufor staje się tablicą numpy
+    bez kopiowania (big_endian=True, np. audio/L16 — z zamianą bajtów). Inną
+    częstotliwość przepróbkowujemy liniowo do 24 kHz.
+    """
+    if len(audio_bytes) % 2:
+        audio_bytes = audio_bytes[:-1]
+    pcm = np.frombuffer(audio_bytes, dtype=">i2" if big_endian else "<i2")
+    if big_endian:
+        pcm = pcm.astype("<i2")
+    if sample_rate == SAMPLE_RATE or pcm.size == 0:
+        return pcm
+    duration = pcm.size / sample_rate
+    target_times = np.arange(int(duration * SAMPLE_RATE)) / SAMPLE_RATE
+    source_times = np.arange(pcm.size) / sample_rate
+    return np.interp(target_times, source_times, pcm).astype(np.int16)
+
+
+def decode_upload(audio_bytes: bytes, mimetype: str, params: dict = None) -> np.ndarray:
+    """
+    Dekoduje nagranie według Content-Type: audio/pcm ;rate=... to surowe próbki
+    int16 little-endian (z przeglądarki), audio/L16 — big-endian (RFC 2586),
+    wszystko inne traktujemy jako skompresowane (WebM/Opus). Nieprawidłowy
+    parametr rate — ValueError.
+    """
+    params = params or {}
+    if mimetype in ("audio/pcm", "audio/l16"):
+        rate = parse_sample_rate(params.get("rate", SAMPLE_RATE))
+        archive_upload(audio_bytes, "pcm")
+        return decode_raw_pcm(audio_bytes, rate, big_endian=mimetype == "audio/l16")
+    archive_upload(audio_bytes, "webm")
+    return decode_to_pcm16(audio_bytes)
+
+
+def decode_to_pcm16(audio_bytes: bytes) -> np.ndarray:
+    """
+    Dekoduje nagranie z przeglądarki (WebM/Opus) do int16, 24 kHz, mono.
+    Używa PyAV w procesie, a gdy nie jest zainstalowany — ffmpeg jako podprocesu.
+    """
+    if av is not None:
+        return _decode_with_pyav(audio_bytes)
+    return _decode_with_ffmpeg(audio_bytes)
@@ -2,26 +2,33 @@
 
 import base64
 import asyncio
-from typing import Optional
+from typing import AsyncIterator, Iterator, Optional
 
-from openai import AsyncOpenAI
-from openai.helpers import LocalAudioPlayer
+import numpy as np
 
 import config
+import async_runtime
+from async_runtime import async_openai
+from tts_cache import tts_cache
+from util import AudioPlayer
 
-# inicjalizacja asynchronicznego klienta
-async_openai = AsyncOpenAI(api_key=config.OPENAI_API_KEY)
+TTS_INSTRUCTIONS = "Speak in a cheerful and positive tone."
+TTS_FORMAT = "pcm"
+
+
+def _cache_key(text: str) -> str:
+    return tts_cache.key_for(text, config.OPENAI_TTS_MODEL, config.OPENAI_TTS_VOICE, TTS_INSTRUCTIONS, TTS_FORMAT)
+
+def _play_pcm(pcm: bytes) -> None:
+    """Odtwarza gotowy PCM (int16, 24 kHz, mono) na backendzie."""
+    with AudioPlayer() as player:
+        player.add_audio(np.frombuffer(pcm, dtype=np.int16))
 
 async def _play_text_async(text: str) -> None:
-    """Odtwarza audio strumieniowo na backendzie."""
-    async with async_openai.audio.speech.with_streaming_response.create(
-        model=config.OPENAI_TTS_MODEL,
-        voice=config.OPENAI_TTS_VOICE,
-        input=text,
-        instructions="Speak in a cheerful and positive tone.",
-        response_format="pcm",
-    ) as response:
-        await LocalAudioPlayer().play(response)
+    """Odtwarza audio strumieniowo na backendzie (cache zapisuje _stream_pcm_async)."""
+    with AudioPlayer() as player:
+        async for pcm in _stream_pcm_async(text):
+            await asyncio.to_thread(player.add_audio, np.frombuffer(pcm, dtype=np.int16))
 
 async def _collect_pcm_async(text: str) -> bytes:
     """
@@ -32,8 +39,8 @@ async def _collect_pcm_async(text: str) -> bytes:
         model=config.OPENAI_TTS_MODEL,
         voice=config.OPENAI_TTS_VOICE,
         input=text,
-        instructions="Speak in a cheerful and positive tone.",
-        response_format="pcm",
+        instructions=TTS_INSTRUCTIONS,
+        response_format=TTS_FORMAT,
     )
 
     if hasattr(resp, "aread"):
@@ -47,16 +54,65 @@ async def _collect_pcm_async(text: str) -> bytes:
 
     raise TypeError(f"Nie można przekonwertować {type(resp)} na bytes")
 
+async def _stream_pcm_async(text: str) -> AsyncIterator[bytes]:
+    """
+    Oddaje kawałki PCM tak, jak przychodzą z API (każdy o parzystej długości,
+    żeby nie rozcinać próbek int16). Pełne nagranie trafia na końcu do cache.
+    """
+    chunks = []
+    pending = b""
+    async with async_openai.audio.speech.with_streaming_response.create(
+        model=config.OPENAI_TTS_MODEL,
+        voice=config.OPENAI_TTS_VOICE,
+        input=text,
+        instructions=TTS_INSTRUCTIONS,
+        response_format=TTS_FORMAT,
+    ) as response:
+        async for chunk in response.iter_bytes(4800):
+            chunks.append(chunk)
+            # próbki int16 mogą być rozcięte między kawałkami
+            data = pending + chunk
+            usable = len(data) - len(data) % 2
+            pending = data[usable:]
+            if usable:
+                yield data[:usable]
+    tts_cache.put(_cache_key(text), b"".join(chunks))
+
+def stream_pcm(text: str) -> Iterator[bytes]:
+    """
+    Strumień PCM (int16, 24 kHz, mono) do wysłania przeglądarce kawałek po kawałku.
+    Trafienie w cache czyta plik z dysku, w przeciwnym razie przekazujemy
+    kawałki z TTS, gdy tylko nadejdą.
+    """
+    chunks = tts_cache.iter_chunks(_cache_key(text))
+    if chunks is not None:
+        return chunks
+    return async_runtime.iterate(_stream_pcm_async(text))
+
+def synthesize_pcm(text: str) -> bytes:
+    """Zwraca surowy PCM (int16, 24 kHz, mono) dla podanego tekstu — z cache, jeśli jest."""
+    key = _cache_key(text)
+    pcm_bytes = tts_cache.get(key)
+    if pcm_bytes is None:
+        pcm_bytes = async_runtime.run(_collect_pcm_async(text))
+        tts_cache.put(key, pcm_bytes)
+    return pcm_bytes
+
 def handle_audio(text: str, play_on = None) -> Optional[str]:
     """
     Jeśli config.PLAY_ON_BACKEND jest True:
       – odtwarza audio na serwerze i zwraca None.
     W przeciwnym razie:
       – zwraca Base64 strumienia PCM do wysłania front-endowi.
+    Powtarzające się teksty (przypomnienia, powitania) są brane z cache TTS.
     """
     if config.PLAY_ON_BACKEND or play_on:
-        asyncio.run(_play_text_async(text))
+        pcm_bytes = tts_cache.get(_cache_key(text))
+        if pcm_bytes is not None:
+            _play_pcm(pcm_bytes)
+        else:
+            async_runtime.run(_play_text_async(text))
         return None
     else:
-        pcm_bytes = asyncio.run(_collect_pcm_async(text))
+        pcm_bytes = synthesize_pcm(text)
         return base64.b64encode(pcm_bytes).decode('utf-8')
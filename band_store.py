@@ -0,0 +1,264 @@
+# band_store.py
+
+import os
+import json
+import math
+import time
+import threading
+from array import array
+from datetime import datetime
+from typing import Callable, Iterable, Iterator, Optional
+
+# Pola liczbowe i logiczne, które sprawdzamy w pomiarach (pozostałe pola przepuszczamy)
+NUMERIC_FIELDS = ("heart_rate", "spo2", "battery")
+BOOLEAN_FIELDS = ("fall_detected",)
+# Czas pomiaru z urządzenia (ISO 8601 ze strefą) — bramka wysyła go z buforowanymi pomiarami
+MEASURED_AT_FIELD = "measured_at"
+# Tolerancja zegara urządzenia: pomiar „z przyszłości” dalej niż o tyle sekund jest odrzucany
+MAX_CLOCK_SKEW_SECONDS = 300
+
+
+def validate_band_record(record) -> Optional[str]:
+    """Zwraca opis błędu dla niepoprawnego pomiaru albo None, jeśli pomiar jest poprawny."""
+    if not isinstance(record, dict):
+        return "Oczekiwano obiektu JSON"
+    for field in NUMERIC_FIELDS:
+        value = record.get(field)
+        if value is None:
+            continue
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+            return f"Pole '{field}' musi być liczbą"
+    for field in BOOLEAN_FIELDS:
+        value = record.get(field)
+        if value is not None and not isinstance(value, bool):
+            return f"Pole '{field}' musi być wartością logiczną"
+    measured_at = record.get(MEASURED_AT_FIELD)
+    if measured_at is not None:
+        try:
+            measured = datetime.fromisoformat(measured_at)
+        except (TypeError, ValueError):
+            return f"Pole '{MEASURED_AT_FIELD}' musi być datą ISO 8601"
+        if measured.tzinfo is None:
+            return f"Pole '{MEASURED_AT_FIELD}' musi zawierać strefę czasową (np. Z)"
+        if measured.timestamp() > time.time() + MAX_CLOCK_SKEW_SECONDS:
+            return f"Pole '{MEASURED_AT_FIELD}' wskazuje czas w przyszłości"
+    return None
+
+
+def _flatten(entry: dict) -> dict:
+    """Stary format {"received_at", "data": {...}} sprowadza do płaskiego rekordu."""
+    data = entry.get("data")
+    if isinstance(data, dict):
+        flat = {k: v for k, v in entry.items() if k != "data"}
+        flat.update(data)
+        return flat
+    return entry
+
+
+class BandDataStore:
+    """
+    Historia pomiarów z opaski zapisywana jako JSON Lines (jeden rekord na linię).
+
+    Nowy pomiar to dopisanie jednej linii na końcu pliku (O(1)), a w pamięci
+    trzymamy indeks offsetów rekordów, więc odczyt ostatnich N pomiarów
+    czyta tylko ogon pliku zamiast parsować całą historię.
+    Każdy rekord dostaje rosnące pole "id". Historia jest tylko dopisywana —
+    stan pomiarów (np. potwierdzone anomalie) trzymamy osobno, kluczem jest "id".
+    """
+
+    def __init__(self, path: str, legacy_path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._offsets = array("q")
+        self._size = 0
+        self._next_id = 0
+        self._listeners = []
+
+        if legacy_path and not os.path.exists(path) and os.path.exists(legacy_path):
+            self._import_legacy(legacy_path)
+        self._build_index()
+
+    # ——————————————————————————————————————————————————————————
+    # Inicjalizacja
+    # ——————————————————————————————————————————————————————————
+
+    def _import_legacy(self, legacy_path: str) -> None:
+        """Jednorazowa migracja starego pliku JSON (jedna lista) do JSON Lines."""
+        try:
+            with open(legacy_path, "r", encoding="utf-8") as f:
+                history = json.load(f)
+            if not isinstance(history, list):
+                history = []
+        except (OSError, json.JSONDecodeError):
+            history = []
+
+        records = []
+        for i, entry in enumerate(e for e in history if isinstance(e, dict)):
+            record = _flatten(entry)
+            record["id"] = i
+            records.append(record)
+        self._write_all(records)
+        print(f"Migrated {len(records)} band entries from {legacy_path} to {self.path}")
+
+    def _build_index(self) -> None:
+        """Jedno przejście po pliku przy starcie: offsety linii i następne id."""
+        self._offsets = array("q")
+        self._size = 0
+        self._next_id = 0
+        if not os.path.exists(self.path):
+            return
+
+        last_line = b""
+        with open(self.path, "rb") as f:
+            offset = 0
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Niedokończony zapis (np. po awarii) — ucinamy go
+                    f.close()
+                    os.truncate(self.path, offset)
+                    break
+                if line.strip():
+                    self._offsets.append(offset)
+                    last_line = line
+                offset += len(line)
+            self._size = offset
+
+        if last_line:
+            try:
+                self._next_id = int(json.loads(last_line).get("id", -1)) + 1
+            except (ValueError, TypeError, AttributeError):
+                self._next_id = len(self._offsets)
+        self._next_id = max(self._next_id, len(self._offsets))
+
+    def _write_all(self, records: list) -> None:
+        """Atomowo zastępuje cały plik (zapis do pliku tymczasowego + rename)."""
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.path)
+
+    # ——————————————————————————————————————————————————————————
+    # Zapis
+    # ——————————————————————————————————————————————————————————
+
+    def append(self, record: dict) -> dict:
+        """Dopisuje pomiar na końcu historii i zwraca zapisany rekord (z "id")."""
+        with self._lock:
+            stored = dict(record)
+            stored["id"] = self._next_id
+            line = (json.dumps(stored, ensure_ascii=False) + "\n").encode("utf-8")
+            with open(self.path, "ab") as f:
+                f.write(line)
+            self._offsets.append(self._size)
+            self._size += len(line)
+            self._next_id += 1
+        self._notify([stored])
+        return stored
+
+    def append_many(self, records: Iterable[dict]) -> list:
+        """
+        Dopisuje paczkę pomiarów jednym zapisem do pliku (jedna "transakcja").
+        Zwraca zapisane rekordy z nadanymi "id".
+        """
+        with self._lock:
+            stored_records = []
+            lines = []
+            offsets = []
+            size = self._size
+            for i, record in enumerate(records):
+                stored = dict(record)
+                stored["id"] = self._next_id + i
+                line = (json.dumps(stored, ensure_ascii=False) + "\n").encode("utf-8")
+                offsets.append(size)
+                size += len(line)
+                lines.append(line)
+                stored_records.append(stored)
+            if not lines:
+                return []
+
+            with open(self.path, "ab") as f:
+                f.write(b"".join(lines))
+            self._offsets.extend(offsets)
+            self._size = size
+            self._next_id += len(stored_records)
+        self._notify(stored_records)
+        return stored_records
+
+    # ——————————————————————————————————————————————————————————
+    # Subskrypcje
+    # ——————————————————————————————————————————————————————————
+
+    def subscribe(self, listener: Callable[[list], None]) -> None:
+        """Rejestruje funkcję wołaną z listą nowo zapisanych rekordów (po każdym zapisie)."""
+        self._listeners.append(listener)
+
+    def _notify(self, records: list) -> None:
+        for listener in self._listeners:
+            try:
+                listener(records)
+            except Exception as e:
+                print(f"Błąd obsługi nowych pomiarów ({listener}): {e}")
+
+    # ——————————————————————————————————————————————————————————
+    # Odczyt
+    # ——————————————————————————————————————————————————————————
+
+    def _read_from(self, index: int) -> list:
+        if index >= len(self._offsets):
+            return []
+        start = self._offsets[index]
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            chunk = f.read(self._size - start)
+        return [json.loads(line) for line in chunk.splitlines() if line.strip()]
+
+    def iter_all(self) -> Iterator[dict]:
+        """Przechodzi po całej (dotychczasowej) historii strumieniowo, linia po linii."""
+        return self.iter_after(-1)
+
+    def iter_after(self, record_id: int) -> Iterator[dict]:
+        """
+        Rekordy o id większym niż record_id, strumieniowo. Id rosną wraz z
+        pozycją w pliku, więc początek znajdujemy wyszukiwaniem binarnym po
+        indeksie offsetów — wcześniejsza historia nie jest parsowana.
+        """
+        with self._lock:
+            count = len(self._offsets)
+            end = self._size
+        if not count:
+            return
+        with open(self.path, "rb") as f:
+            lo, hi = 0, count
+            while lo < hi:
+                mid = (lo + hi) // 2
+                f.seek(self._offsets[mid])
+                if json.loads(f.readline()).get("id", -1) > record_id:
+                    hi = mid
+                else:
+                    lo = mid + 1
+            if lo == count:
+                return
+            offset = self._offsets[lo]
+            f.seek(offset)
+            for line in f:
+                offset += len(line)
+                if offset > end:
+                    break
+                if line.strip():
+                    yield json.loads(line)
+
+    def recent(self, count: int) -> list:
+        """Zwraca `count` ostatnich pomiarów (od najstarszego do najnowszego)."""
+        if count <= 0:
+            return []
+        with self._lock:
+            return self._read_from(max(0, len(self._offsets) - count))
+
+    def last(self) -> Optional[dict]:
+        records = self.recent(1)
+        return records[0] if records else None
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
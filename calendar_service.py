@@ -0,0 +1,249 @@
+# calendar_service.py
+
+import os
+import json
+import time
+import threading
+from datetime import datetime, timezone, timedelta
+from typing import Optional
+
+import httplib2
+from dateutil import parser
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+from google_auth_oauthlib.flow import InstalledAppFlow
+from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+
+import config
+from reminder_cache import reminder_cache
+
+# ——————————————————————————————————————————————————————————
+# Klient Google Calendar (jeden na proces)
+# ——————————————————————————————————————————————————————————
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def _load_credentials() -> Credentials:
+    creds = None
+    if os.path.exists(config.GOOGLE_TOKEN_FILE):
+        creds = Credentials.from_authorized_user_file(config.GOOGLE_TOKEN_FILE, config.SCOPES)
+    if creds and creds.expired and creds.refresh_token:
+        creds.refresh(Request())
+    if not creds or not creds.valid:
+        flow = InstalledAppFlow.from_client_secrets_file(config.GOOGLE_CREDENTIALS_FILE, config.SCOPES)
+        creds = flow.run_local_server(port=0)
+    with open(config.GOOGLE_TOKEN_FILE, 'w') as token:
+        token.write(creds.to_json())
+    return creds
+
+
+def get_calendar_service():
+    """
+    Zwraca klienta Calendar API budowanego raz na proces.
+    Przy CALENDAR_BACKEND=fake zwraca lokalny FakeCalendarService.
+    """
+    global _service
+    with _service_lock:
+        if _service is None:
+            if config.CALENDAR_BACKEND == "fake":
+                _service = FakeCalendarService(config.FAKE_CALENDAR_FILE)
+            else:
+                _service = build('calendar', 'v3', credentials=_load_credentials())
+        return _service
+
+
+# ——————————————————————————————————————————————————————————
+# Lokalny kalendarz do testów i pracy bez konta Google
+# ——————————————————————————————————————————————————————————
+
+class _FakeRequest:
+    def __init__(self, fn):
+        self._fn = fn
+
+    def execute(self):
+        return self._fn()
+
+
+class FakeCalendarService:
+    """
+    Zamiennik klienta Calendar API czytający wydarzenia z pliku JSON
+    (lista wydarzeń albo {"items": [...]}, w formacie Google Calendar).
+
+    Obsługuje to, czego używa CalendarEventCache: events().list(...).execute()
+    z pełną synchronizacją (timeMin/timeMax) i przyrostową (syncToken).
+    Zmiany w pliku są wykrywane przy każdym wywołaniu i zamieniane na delty;
+    usunięte wydarzenia wracają jako status="cancelled".
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._signature = None
+        self._events = {}
+        self._changed_at = {}
+        self._version = 0
+
+    def _reload(self) -> None:
+        try:
+            st = os.stat(self.path)
+            signature = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            signature = None
+        if signature == self._signature:
+            return
+        self._signature = signature
+
+        items = []
+        if signature is not None:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            items = data.get("items", []) if isinstance(data, dict) else data
+
+        self._version += 1
+        current = {ev["id"]: ev for ev in items if isinstance(ev, dict) and "id" in ev}
+        for event_id, ev in current.items():
+            if self._events.get(event_id) != ev:
+                self._changed_at[event_id] = self._version
+        for event_id, ev in self._events.items():
+            if event_id not in current:
+                if ev.get("status") != "cancelled":
+                    self._changed_at[event_id] = self._version
+                current[event_id] = {"id": event_id, "status": "cancelled"}
+        self._events = current
+
+    def _list(self, syncToken: Optional[str] = None, timeMin: Optional[str] = None,
+              timeMax: Optional[str] = None, **_) -> dict:
+        with self._lock:
+            self._reload()
+            if syncToken is not None:
+                since = int(syncToken)
+                if since > self._version:
+                    raise HttpError(httplib2.Response({"status": 410}), b"Sync token is no longer valid")
+                items = [ev for event_id, ev in self._events.items() if self._changed_at.get(event_id, 0) > since]
+            else:
+                items = [ev for ev in self._events.values() if ev.get("status") != "cancelled"]
+                if timeMin:
+                    items = [ev for ev in items if event_end(ev) > parser.isoparse(timeMin)]
+                if timeMax:
+                    items = [ev for ev in items if event_start(ev) < parser.isoparse(timeMax)]
+            return {"items": [dict(ev) for ev in items], "nextSyncToken": str(self._version)}
+
+    def events(self):
+        service = self
+
+        class _Events:
+            def list(self, **kwargs):
+                return _FakeRequest(lambda: service._list(**kwargs))
+
+        return _Events()
+
+
+# ——————————————————————————————————————————————————————————
+# Cache wydarzeń z synchronizacją przyrostową (syncToken)
+# ——————————————————————————————————————————————————————————
+
+def _parse_event_time(value: dict) -> datetime:
+    raw = value.get('dateTime', value.get('date'))
+    dt = parser.isoparse(raw)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+def event_start(ev: dict) -> datetime:
+    return _parse_event_time(ev['start'])
+
+
+def event_end(ev: dict) -> datetime:
+    return _parse_event_time(ev.get('end') or ev['start'])
+
+
+class CalendarEventCache:
+    """
+    Wydarzenia kalendarza trzymane w pamięci.
+
+    Pierwsza synchronizacja pobiera okno [teraz - 1 dzień, teraz + CALENDAR_SYNC_WINDOW_DAYS],
+    kolejne pobierają tylko zmiany (nextSyncToken), najczęściej co
+    CALENDAR_SYNC_INTERVAL_SECONDS. Zapytania o przypomnienia obsługujemy z pamięci.
+    """
+
+    def __init__(self, service_factory=get_calendar_service, calendar_id: str = config.CALENDAR_ID,
+                 window_days: int = config.CALENDAR_SYNC_WINDOW_DAYS,
+                 sync_interval: float = config.CALENDAR_SYNC_INTERVAL_SECONDS):
+        self._service_factory = service_factory
+        self.calendar_id = calendar_id
+        self.window_days = window_days
+        self.sync_interval = sync_interval
+        self._lock = threading.Lock()
+        self._events = {}
+        self._sync_token = None
+        self._window_end = None
+        self._last_sync = None
+
+    def _apply(self, ev: dict) -> None:
+        if ev.get('status') == 'cancelled':
+            if self._events.pop(ev['id'], None) is not None:
+                reminder_cache.invalidate(ev['id'])
+        elif 'start' in ev:
+            self._events[ev['id']] = ev
+
+    def _list_all(self, service, **params) -> Optional[str]:
+        """Pobiera wszystkie strony wyników i zwraca nextSyncToken."""
+        page_token = None
+        while True:
+            result = service.events().list(calendarId=self.calendar_id, singleEvents=True,
+                                           pageToken=page_token, **params).execute()
+            for ev in result.get('items', []):
+                self._apply(ev)
+            page_token = result.get('nextPageToken')
+            if not page_token:
+                return result.get('nextSyncToken')
+
+    def _full_sync(self, service, now: datetime) -> None:
+        self._events.clear()
+        self._window_end = now + timedelta(days=self.window_days)
+        self._sync_token = self._list_all(
+            service,
+            timeMin=(now - timedelta(days=1)).isoformat(),
+            timeMax=self._window_end.isoformat(),
+        )
+        print(f"Calendar full sync: {len(self._events)} events.")
+
+    def sync(self, force: bool = False, horizon_days: int = 10) -> None:
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            fresh = self._last_sync is not None and time.monotonic() - self._last_sync < self.sync_interval
+            if fresh and not force:
+                return
+
+            service = self._service_factory()
+            if self._sync_token is None or self._window_end < now + timedelta(days=horizon_days):
+                self._full_sync(service, now)
+            else:
+                try:
+                    self._sync_token = self._list_all(service, syncToken=self._sync_token)
+                except HttpError as e:
+                    # 410 Gone — token wygasł, trzeba zsynchronizować wszystko od nowa
+                    if e.resp.status != 410:
+                        raise
+                    self._full_sync(service, now)
+            self._last_sync = time.monotonic()
+
+    def upcoming(self, count: int, days: int = 10) -> list:
+        """
+        Zwraca `count` najbliższych (jeszcze trwających lub przyszłych) wydarzeń
+        z horyzontu `days` dni, posortowanych po czasie rozpoczęcia.
+        """
+        self.sync(horizon_days=days)
+        now = datetime.now(timezone.utc)
+        until = now + timedelta(days=days)
+        with self._lock:
+            items = [ev for ev in self._events.values() if event_end(ev) > now and event_start(ev) < until]
+        items.sort(key=event_start)
+        return items[:count]
+
+
+calendar_events = CalendarEventCache()
@@ -2,18 +2,119 @@
 
 import os
 
+# ——————————————————————————————————————————————————————————
+# Podopieczni (wielu mieszkańców w jednym procesie)
+# ——————————————————————————————————————————————————————————
+# Podopieczny bez podanego id (nagłówek X-Resident-Id / ?resident=) używa plików
+# z tego pliku konfiguracji; pozostali mają własny katalog RESIDENTS_DIR/<id>/
+DEFAULT_RESIDENT_ID = os.getenv('DEFAULT_RESIDENT_ID', 'default')
+RESIDENTS_DIR = os.getenv('RESIDENTS_DIR', 'residents')
+# Przydział podopiecznych do procesu: lista id ("a,b,c") albo shard "i/n"
+# (crc32(id) % n == i). Puste = proces obsługuje wszystkich.
+WORKER_RESIDENTS = [r.strip() for r in os.getenv('WORKER_RESIDENTS', '').split(',') if r.strip()]
+WORKER_SHARD = os.getenv('WORKER_SHARD', '')
+# Znani podopieczni: domyślny, ci z katalogiem w RESIDENTS_DIR i ci z tej listy ("a,b,c").
+# Inne id dostają 404 — literówka w ?resident= nie zakłada nowego podopiecznego.
+RESIDENTS = [r.strip() for r in os.getenv('RESIDENTS', '').split(',') if r.strip()]
+# Kalendarz podopiecznego (nie domyślnego): RESIDENTS_DIR/<id>/calendar.json z {"calendar_id": "..."},
+# a przy CALENDAR_BACKEND=fake — własny RESIDENTS_DIR/<id>/fake_calendar.json. Bez nich — brak kalendarza.
+RESIDENT_CALENDAR_FILE = os.getenv('RESIDENT_CALENDAR_FILE', 'calendar.json')
+
 # ——————————————————————————————————————————————————————————
 # Google Calendar
 # ——————————————————————————————————————————————————————————
 SCOPES = ['https://www.googleapis.com/auth/calendar.readonly']
 # ID kalendarza (np. 'primary' lub pełne calendarId)
 CALENDAR_ID = os.getenv('CALENDAR_ID', 'primary')
+# 'google' albo 'fake' (lokalny plik z wydarzeniami, np. do testów)
+CALENDAR_BACKEND = os.getenv('CALENDAR_BACKEND', 'google').lower()
+FAKE_CALENDAR_FILE = os.getenv('FAKE_CALENDAR_FILE', 'fake_calendar.json')
+# Jak często (najczęściej) pobieramy zmiany z kalendarza i jak szerokie okno trzymamy w pamięci
+CALENDAR_SYNC_INTERVAL_SECONDS = float(os.getenv('CALENDAR_SYNC_INTERVAL_SECONDS', '60'))
+CALENDAR_SYNC_WINDOW_DAYS = int(os.getenv('CALENDAR_SYNC_WINDOW_DAYS', '30'))
 
 PLAY_ON_BACKEND = os.getenv('PLAY_ON_BACKEND', 'False').lower() in ('true', '1', 'yes')
 
-HISTORY_BAND_DATA_FILE = os.getenv('HISTORY_BAND_DATA_FILE', 'band_data.json')
-TRANSCRIPT_HISTORY_FILE = os.getenv('TRANSCRIPT_HISTORY_FILE', 'transcript_history.json')
+# Sesja głosowa na żywo przez WebSocket (mikrofon strumieniowany w trakcie mówienia)
+VOICE_SESSION_ENABLED = os.getenv('VOICE_SESSION_ENABLED', 'True').lower() in ('true', '1', 'yes')
+# Ile czekać po „Stop” na transkrypcję ostatniej wypowiedzi, zanim zamkniemy STT
+VOICE_SESSION_STOP_GRACE_SECONDS = float(os.getenv('VOICE_SESSION_STOP_GRACE_SECONDS', '1.5'))
+
+# Kolejka tur /api/voice (voice_queue.py): osobna pula wątków, limit oczekujących (ponad limit — HTTP 429)
+VOICE_QUEUE_WORKERS = int(os.getenv('VOICE_QUEUE_WORKERS', '2'))
+VOICE_QUEUE_MAX_PENDING = int(os.getenv('VOICE_QUEUE_MAX_PENDING', '4'))
+# Jak długo wynik tury zleconej z ?async=1 czeka na odbiór (GET /api/voice/jobs/<id>)
+VOICE_JOB_RESULT_TTL_SECONDS = float(os.getenv('VOICE_JOB_RESULT_TTL_SECONDS', '300'))
+
+# Serwer produkcyjny (wsgi.py) — jeden proces, wątki dla lekkich tras i strumieni SSE
+SERVER_HOST = os.getenv('SERVER_HOST', '0.0.0.0')
+SERVER_PORT = int(os.getenv('SERVER_PORT', '5000'))
+# Każdy strumień SSE i każda sesja WebSocket zajmuje wątek na cały czas połączenia,
+# a każda tura /api/voice (czekająca lub strumieniowana) — na czas tury. Zasada doboru:
+#   SERVER_THREADS >= SERVER_MAX_STREAMS + VOICE_QUEUE_WORKERS + VOICE_QUEUE_MAX_PENDING + zapas na ingest
+# (domyślnie 32 >= 16 + 2 + 4 + 10). Ekran podopiecznego to zwykle 2 połączenia.
+SERVER_THREADS = int(os.getenv('SERVER_THREADS', '32'))
+SERVER_MAX_STREAMS = int(os.getenv('SERVER_MAX_STREAMS', '16'))
+
+# Zapisywanie oryginalnych nagrań z przeglądarki (w tle) do katalogu uploads
+ARCHIVE_UPLOADS = os.getenv('ARCHIVE_UPLOADS', 'False').lower() in ('true', '1', 'yes')
+UPLOADS_DIR = os.getenv('UPLOADS_DIR', 'uploads')
+
+# ——————————————————————————————————————————————————————————
+# Detekcja mowy (VAD) — wycinanie ciszy przed transkrypcją
+# ——————————————————————————————————————————————————————————
+VAD_ENABLED = os.getenv('VAD_ENABLED', 'True').lower() in ('true', '1', 'yes')
+VAD_FRAME_MS = int(os.getenv('VAD_FRAME_MS', '30'))
+# Minimalny poziom mowy (dBFS) i wymagany zapas ponad szum tła (dB)
+VAD_THRESHOLD_DB = float(os.getenv('VAD_THRESHOLD_DB', '-50'))
+VAD_NOISE_MARGIN_DB = float(os.getenv('VAD_NOISE_MARGIN_DB', '10'))
+# Zapas ciszy zostawiany wokół mowy; dłuższe pauzy są skracane do 2 × ta wartość
+VAD_PADDING_MS = int(os.getenv('VAD_PADDING_MS', '300'))
+
+# Historia pomiarów z opaski w formacie JSON Lines (dopisywana, nigdy nie przepisywana)
+HISTORY_BAND_DATA_FILE = os.getenv('HISTORY_BAND_DATA_FILE', 'band_data.jsonl')
+# Stary plik JSON z historią — importowany jednorazowo, jeśli dziennik jeszcze nie istnieje
+LEGACY_HISTORY_BAND_DATA_FILE = os.getenv('LEGACY_HISTORY_BAND_DATA_FILE', 'band_data.json')
+# Dziennik potwierdzonych anomalii (id pomiaru) — historia pomiarów pozostaje nietknięta
+ANOMALY_ACK_FILE = os.getenv('ANOMALY_ACK_FILE', 'anomaly_acks.jsonl')
+# Punkt kontrolny indeksu anomalii (ostatnie przejrzane id i otwarte anomalie) — przy
+# starcie skanujemy tylko pomiary zapisane po nim; zapisywany co ANOMALY_CHECKPOINT_EVERY pomiarów
+ANOMALY_CHECKPOINT_FILE = os.getenv('ANOMALY_CHECKPOINT_FILE', 'anomaly_index.json')
+ANOMALY_CHECKPOINT_EVERY = int(os.getenv('ANOMALY_CHECKPOINT_EVERY', 500))
+
+# ——————————————————————————————————————————————————————————
+# Analiza parametrów życiowych
+# ——————————————————————————————————————————————————————————
+# Bezpieczne zakresy (poza nimi pomiar jest anomalią)
+HR_MIN = float(os.getenv('HR_MIN', '50'))
+HR_MAX = float(os.getenv('HR_MAX', '120'))
+SPO2_MIN = float(os.getenv('SPO2_MIN', '90'))
+# Ile ostatnich pomiarów trzymamy w pamięci do analizy trendów
+VITALS_BUFFER_SIZE = int(os.getenv('VITALS_BUFFER_SIZE', '2048'))
+# Okna analizy w minutach (np. "5,60")
+VITALS_WINDOWS_MINUTES = [int(m) for m in os.getenv('VITALS_WINDOWS_MINUTES', '5,60').split(',') if m.strip()]
+# Od jakiego |z| ostatni pomiar uznajemy za odbiegający od okna
+VITALS_ZSCORE_THRESHOLD = float(os.getenv('VITALS_ZSCORE_THRESHOLD', '3.0'))
+# Powiadamiaj opiekuna od razu przy zapisie anomalnego pomiaru (bez czekania na rozmowę)
+ANOMALY_AUTO_NOTIFY = os.getenv('ANOMALY_AUTO_NOTIFY', 'True').lower() in ('true', '1', 'yes')
+# Historia rozmów jako JSON Lines (tylko dopisywanie, rotacja po rozmiarze)
+TRANSCRIPT_HISTORY_FILE = os.getenv('TRANSCRIPT_HISTORY_FILE', 'transcript_history.jsonl')
+# Stary plik JSON z historią rozmów — importowany jednorazowo
+LEGACY_TRANSCRIPT_HISTORY_FILE = os.getenv('LEGACY_TRANSCRIPT_HISTORY_FILE', 'transcript_history.json')
+# Ile ostatnich tur trzymamy w pamięci (dla promptu)
+TRANSCRIPT_RECENT_TURNS = int(os.getenv('TRANSCRIPT_RECENT_TURNS', '20'))
+TRANSCRIPT_LOG_MAX_MB = float(os.getenv('TRANSCRIPT_LOG_MAX_MB', '5'))
+TRANSCRIPT_LOG_BACKUPS = int(os.getenv('TRANSCRIPT_LOG_BACKUPS', '3'))
+TRANSCRIPT_MAX_AGE_DAYS = float(os.getenv('TRANSCRIPT_MAX_AGE_DAYS', '30'))
 NOTIFICATION_HISTORY_FILE = os.getenv('NOTIFICATION_HISTORY_FILE', 'notification_history.json')
+# Ile ostatnich powiadomień przechowujemy (starsze są usuwane przy dopisywaniu)
+NOTIFICATION_HISTORY_MAX = int(os.getenv('NOTIFICATION_HISTORY_MAX', '500'))
+# Co ile sekund strumień powiadomień (SSE) wysyła keep-alive, gdy nic się nie dzieje
+NOTIFICATION_STREAM_KEEPALIVE_SECONDS = float(os.getenv('NOTIFICATION_STREAM_KEEPALIVE_SECONDS', '15'))
+
+# Stały kontekst użytkownika wstawiany do promptu asystenta
+DAILY_ROUTINE_FILE = os.getenv('DAILY_ROUTINE_FILE', 'daily_routine_context.json')
+MEDICATIONS_FILE = os.getenv('MEDICATIONS_FILE', 'proposed_medications.json')
 
 # Ścieżki do plików kredencjałów OAuth2
 GOOGLE_CREDENTIALS_FILE = os.getenv('GOOGLE_CREDENTIALS_FILE', 'credentials.json')
@@ -31,9 +132,41 @@ OPENAI_CHAT_MODEL_CALENDAR   = os.getenv('OPENAI_CHAT_MODEL',   'gpt-4.1')
 OPENAI_TTS_MODEL    = os.getenv('OPENAI_TTS_MODEL',    'gpt-4o-mini-tts')
 OPENAI_TTS_VOICE    = os.getenv('OPENAI_TTS_VOICE',    'coral')
 OPENAI_TTS_FORMAT   = os.getenv('OPENAI_TTS_FORMAT',   'mp3')
+# Cache wygenerowanej mowy (PCM) na dysku, z limitem rozmiaru
+TTS_CACHE_DIR       = os.getenv('TTS_CACHE_DIR',       'tts_cache')
+TTS_CACHE_MAX_MB    = int(os.getenv('TTS_CACHE_MAX_MB', '200'))
+
+# ——————————————————————————————————————————————————————————
+# Cache tekstów przypomnień
+# ——————————————————————————————————————————————————————————
+REMINDER_CACHE_FILE = os.getenv('REMINDER_CACHE_FILE', 'reminder_cache.json')
+REMINDER_CACHE_TTL_HOURS = float(os.getenv('REMINDER_CACHE_TTL_HOURS', '24'))
+REMINDER_CACHE_MAX_ENTRIES = int(os.getenv('REMINDER_CACHE_MAX_ENTRIES', '500'))
+# Ile przypomnień generujemy równolegle i ile maksymalnie czekamy na LLM (sekundy)
+REMINDER_CONCURRENCY = int(os.getenv('REMINDER_CONCURRENCY', '4'))
+REMINDER_LLM_TIMEOUT = float(os.getenv('REMINDER_LLM_TIMEOUT', '10'))
+
+# ——————————————————————————————————————————————————————————
+# Pamięć rozmowy (streszczenie kroczące)
+# ——————————————————————————————————————————————————————————
+MEMORY_FILE = os.getenv('MEMORY_FILE', 'conversation_memory.json')
+OPENAI_SUMMARY_MODEL = os.getenv('OPENAI_SUMMARY_MODEL', 'gpt-4o-mini')
+# Streszczenie jest aktualizowane, gdy zbierze się tyle nowych tur (poza ostatnią)
+MEMORY_FOLD_EVERY_TURNS = int(os.getenv('MEMORY_FOLD_EVERY_TURNS', '2'))
+MEMORY_SUMMARY_MAX_WORDS = int(os.getenv('MEMORY_SUMMARY_MAX_WORDS', '150'))
+MEMORY_LLM_TIMEOUT = float(os.getenv('MEMORY_LLM_TIMEOUT', '20'))
 
 # ——————————————————————————————————————————————————————————
 # Scheduler
 # ——————————————————————————————————————————————————————————
 CHECK_INTERVAL_MINUTES = int(os.getenv('CHECK_INTERVAL_MINUTES', '1'))
 REMINDER_TOLERANCE = int(os.getenv('REMINDER_TOLERANCE', '60'))  # ± tolerance in seconds
+REMINDER_SCHEDULER_ENABLED = os.getenv('REMINDER_SCHEDULER_ENABLED', 'True').lower() in ('true', '1', 'yes')
+# Ile minut przed wydarzeniem doręczamy przypomnienie (0 = o czasie rozpoczęcia)
+REMINDER_LEAD_MINUTES = int(os.getenv('REMINDER_LEAD_MINUTES', '0'))
+# Dla wydarzeń w tym horyzoncie przygotowujemy z wyprzedzeniem tekst i audio
+SCHEDULER_LOOKAHEAD_MINUTES = int(os.getenv('SCHEDULER_LOOKAHEAD_MINUTES', '60'))
+SCHEDULER_MAX_EVENTS = int(os.getenv('SCHEDULER_MAX_EVENTS', '10'))
+# Co ile sekund sprawdzamy, czy trzeba doręczyć przygotowane przypomnienie
+SCHEDULER_TICK_SECONDS = int(os.getenv('SCHEDULER_TICK_SECONDS', '5'))
+DELIVERED_REMINDERS_FILE = os.getenv('DELIVERED_REMINDERS_FILE', 'delivered_reminders.json')
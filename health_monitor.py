@@ -0,0 +1,124 @@
+# health_monitor.py
+
+import json
+import threading
+from typing import Iterable
+
+import config
+from anomalies import AnomalyIndex, anomaly_conditions, compact_anomaly, is_anomaly
+from band_store import BandDataStore
+from notifications import NotificationFeed
+from vitals_analytics import VitalsAnalytics
+
+
+def _describe(record: dict) -> str:
+    parts = []
+    if record.get("fall_detected"):
+        parts.append("fall detected")
+    hr = record.get("heart_rate")
+    if isinstance(hr, (int, float)) and not (config.HR_MIN <= hr <= config.HR_MAX):
+        parts.append(f"heart rate {hr:g}")
+    sp = record.get("spo2")
+    if isinstance(sp, (int, float)) and sp < config.SPO2_MIN:
+        parts.append(f"SpO₂ {sp:g}%")
+    return ", ".join(parts) + f" at {record.get('measured_at') or record.get('received_at', '?')}"
+
+
+class HealthMonitor:
+    """
+    Kontrola pomiarów w chwili zapisu (subskrypcja band_store), niezależnie od rozmowy.
+
+    Nowe anomalie (progi z config) i nowe sygnały trendu (z-score z
+    VitalsAnalytics) od razu trafiają do powiadomień opiekuna — raz na stan
+    alarmowy (upadek, niskie/wysokie tętno, niskie SpO₂): kolejne pomiary z
+    tym samym stanem nie wysyłają nic, dopóki anomalie nie zostaną
+    potwierdzone. Bieżący stan
+    alertów jest trzymany jako gotowy, zwięzły JSON z numerem wersji — agent
+    wkleja go do promptu i nie musi wołać narzędzia na początku każdej tury.
+    """
+
+    def __init__(self, store: BandDataStore, index: AnomalyIndex, analytics: VitalsAnalytics,
+                 notifications: NotificationFeed):
+        self._index = index
+        self._notifications = notifications
+        self._analytics = analytics
+        self._lock = threading.Lock()
+        self._trend_metrics = set()
+        self._acknowledged_trends = set()
+        self._trend_alerts = []
+        # Stany alarmowe już zgłoszone opiekunowi (także sprzed restartu), do potwierdzenia
+        self._open_conditions = self._unacknowledged_conditions()
+        self.version = 0
+        self._context = ""
+        # Subskrypcja po indeksie anomalii i analityce — oba widzą już nowe pomiary
+        store.subscribe(self._on_records)
+        self._refresh()
+
+    def _on_records(self, records: Iterable[dict]) -> None:
+        trend_alerts = self._analytics.summary()["alerts"]
+
+        with self._lock:
+            # Powiadamiamy tylko o pomiarach, które otwierają nowy stan alarmowy
+            anomalies = []
+            for record in records:
+                new_conditions = anomaly_conditions(record) - self._open_conditions
+                if new_conditions:
+                    self._open_conditions |= new_conditions
+                    anomalies.append(record)
+
+            active = {a["metric"] for a in trend_alerts}
+            new_trends = [a for a in trend_alerts if a["metric"] not in self._trend_metrics]
+            self._trend_metrics = active
+            # Potwierdzony sygnał trendu nie wraca, dopóki parametr nie wróci do normy
+            self._acknowledged_trends &= active
+            self._trend_alerts = [a for a in trend_alerts if a["metric"] not in self._acknowledged_trends]
+
+        if config.ANOMALY_AUTO_NOTIFY:
+            if anomalies:
+                description = "; ".join(_describe(r) for r in anomalies[-5:])
+                self._notifications.append(event="anomaly", description=f"Automatic alert: {description}")
+            for alert in new_trends:
+                if is_anomaly({alert["metric"]: alert["value"]}):
+                    continue  # wartość poza zakresem — zgłoszona już jako anomalia
+                self._notifications.append(
+                    event="anomaly",
+                    description=f"Sudden change: {alert['metric']} {alert['value']:g} (z={alert['z']:g})",
+                )
+        self._refresh()
+
+    def _unacknowledged_conditions(self) -> set:
+        conditions = set()
+        for record in self._index.unacknowledged():
+            conditions |= anomaly_conditions(record)
+        return conditions
+
+    def _refresh(self) -> None:
+        state = {
+            "open_anomalies": [compact_anomaly(r) for r in self._index.unacknowledged()[-5:]],
+            "trend_alerts": self._trend_alerts,
+        }
+        if not state["open_anomalies"] and not state["trend_alerts"]:
+            context = "No open alerts."
+        else:
+            context = json.dumps(state, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            if context != self._context:
+                self._context = context
+                self.version += 1
+
+    def context(self) -> tuple:
+        """(wersja, tekst) bieżącego stanu alertów do promptu."""
+        with self._lock:
+            return self.version, self._context
+
+    def acknowledge(self, note: str = "") -> int:
+        """Potwierdza otwarte anomalie i sygnały trendu; zwraca liczbę potwierdzonych anomalii."""
+        acknowledged = self._index.acknowledge(note=note)
+        with self._lock:
+            # Pomiary zapisane w trakcie potwierdzania zostają otwarte
+            self._open_conditions = self._unacknowledged_conditions()
+            self._acknowledged_trends |= {a["metric"] for a in self._trend_alerts}
+            self._trend_alerts = []
+        self._refresh()
+        return acknowledged
+
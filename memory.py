@@ -0,0 +1,112 @@
+# memory.py
+
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+import async_runtime
+from async_runtime import async_openai
+from storage import get_store
+from transcripts import TranscriptStore
+
+SUMMARY_INSTRUCTIONS = (
+    "You maintain the running memory of a care assistant talking with an elderly person. "
+    "Merge the new conversation turns into the existing summary. Keep facts that matter later: "
+    "reported symptoms and how the person feels, requests, preferences, plans and promises made. "
+    "Drop greetings and small talk. Write plain English sentences, at most {max_words} words."
+)
+
+
+def _compact(turn: dict) -> dict:
+    return {
+        "timestamp": turn.get("timestamp", ""),
+        "user": turn.get("input_transcript", ""),
+        "assistant": turn.get("output_transcript", ""),
+    }
+
+
+class ConversationMemory:
+    """
+    Kroczące streszczenie rozmowy, żeby prompt nie rósł z jej długością.
+
+    Prompt dostaje stałej wielkości streszczenie starszych tur oraz surowe tury,
+    których streszczenie jeszcze nie objęło (zwykle tylko ostatnią wymianę).
+    Po każdej turze — poza ścieżką odpowiedzi, w jednym wątku w tle — nowe
+    tury (bez ostatniej) są wtapiane w streszczenie przez LLM. Streszczenie
+    i znacznik czasu ostatniej wtopionej tury są zapisywane w MEMORY_FILE.
+    """
+
+    def __init__(self, transcripts: TranscriptStore, path: str):
+        self._transcripts = transcripts
+        self._store = get_store(path, default=dict, indent=None)
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory")
+        self._scheduled = False
+
+    @property
+    def version(self) -> tuple:
+        return (self._store.version, self._transcripts.version)
+
+    def _state(self) -> tuple:
+        state = self._store.read()
+        return state.get("summary", ""), state.get("summarized_until", "")
+
+    def _unsummarized(self, until: str) -> list:
+        recent = self._transcripts.recent(config.TRANSCRIPT_RECENT_TURNS)
+        return [t for t in recent if t.get("timestamp", "") > until]
+
+    def render(self) -> str:
+        """Blok pamięci do promptu: streszczenie + tury jeszcze nieobjęte streszczeniem."""
+        summary, until = self._state()
+        # Gdy streszczanie nie nadąża (np. błąd LLM), prompt i tak ma stały limit tur
+        turns = [_compact(t) for t in self._unsummarized(until)[-(config.MEMORY_FOLD_EVERY_TURNS + 1):]]
+        return (
+            f"Summary of earlier conversation: {summary or 'none yet.'}\n"
+            f"Latest exchanges: {json.dumps(turns, ensure_ascii=False, separators=(',', ':'))}"
+        )
+
+    def schedule_update(self) -> None:
+        """Zleca aktualizację streszczenia w tle (najwyżej jedno oczekujące zadanie)."""
+        with self._lock:
+            if self._scheduled:
+                return
+            self._scheduled = True
+        self._pool.submit(self._update)
+
+    def _update(self) -> None:
+        with self._lock:
+            self._scheduled = False
+        summary, until = self._state()
+        # Ostatnia wymiana zostaje w prompcie w całości
+        pending = self._unsummarized(until)[:-1]
+        if len(pending) < config.MEMORY_FOLD_EVERY_TURNS:
+            return
+        try:
+            new_summary = async_runtime.run(self._summarize(summary, pending))
+        except Exception as e:
+            print(f"Nie udało się zaktualizować streszczenia rozmowy: {e}")
+            return
+        self._store.write({
+            "summary": new_summary,
+            "summarized_until": pending[-1].get("timestamp", ""),
+        })
+
+    async def _summarize(self, summary: str, turns: list) -> str:
+        resp = await async_openai.chat.completions.create(
+            model=config.OPENAI_SUMMARY_MODEL,
+            messages=[
+                {"role": "system", "content": SUMMARY_INSTRUCTIONS.format(max_words=config.MEMORY_SUMMARY_MAX_WORDS)},
+                {"role": "user", "content": json.dumps(
+                    {"summary": summary, "new_turns": [_compact(t) for t in turns]},
+                    ensure_ascii=False,
+                )},
+            ],
+            max_tokens=config.MEMORY_SUMMARY_MAX_WORDS * 2,
+            timeout=config.MEMORY_LLM_TIMEOUT,
+        )
+        return resp.choices[0].message.content.strip()
+
+    def clear(self) -> None:
+        self._store.clear()
+
@@ -1,39 +1,65 @@
 # notifications.py
-import os
-import json
+import time
 import datetime
-import config
+import threading
+from storage import get_store
 
-def append_notification(event: str, description: str) -> None:
+
+class NotificationFeed:
     """
-    Dopisuje do pliku config.NOTIFICATION_HISTORY_FILE wpis:
-    {
-      "timestamp": ISO8601_UTC,
-      "event": event,
-      "description": description
-    }
+    Historia powiadomień (plik JSON) z pub/sub w pamięci.
+
+    Każdy wpis dostaje rosnące "id" (mikrosekundy od epoki, ściśle rosnące także
+    po restarcie), które służy klientom jako kursor: po ponownym połączeniu
+    pobierają tylko wpisy o id większym niż ostatnio widziane.
+    Czytelnicy strumienia (SSE) czekają na Condition i budzą się przy nowym wpisie.
     """
-    path = config.NOTIFICATION_HISTORY_FILE
-
-    # Wczytaj istniejącą listę lub zainicjuj pustą
-    notifications = []
-    if os.path.exists(path):
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                notifications = json.load(f)
-                if not isinstance(notifications, list):
-                    notifications = []
-        except json.JSONDecodeError:
-            notifications = []
-
-    # Stwórz nowy wpis
-    entry = {
-        "timestamp": datetime.datetime.utcnow().isoformat() + "Z",
-        "event": event,
-        "description": description
-    }
-    notifications.append(entry)
-
-    # Zapisz z powrotem
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(notifications, f, ensure_ascii=False, indent=2)
+
+    def __init__(self, path: str, max_entries: int):
+        self.max_entries = max_entries
+        self._store = get_store(path)
+        self._changed = threading.Condition()
+        self._last_id = max((n.get("id", 0) for n in self._store.read()), default=0)
+
+    def _next_id(self) -> int:
+        self._last_id = max(self._last_id + 1, time.time_ns() // 1000)
+        return self._last_id
+
+    def append(self, event: str, description: str) -> dict:
+        """
+        Dopisuje wpis:
+        {
+          "id": kursor,
+          "timestamp": ISO8601_UTC,
+          "event": event,
+          "description": description
+        }
+        i budzi klientów czekających na nowe powiadomienia.
+        """
+        with self._changed:
+            entry = {
+                "id": self._next_id(),
+                "timestamp": datetime.datetime.utcnow().isoformat() + "Z",
+                "event": event,
+                "description": description
+            }
+            # Trzymamy tylko ostatnie max_entries wpisów
+            self._store.update(lambda items: (items + [entry])[-self.max_entries:])
+            self._changed.notify_all()
+        return entry
+
+    def since(self, cursor: int = 0) -> list:
+        """Wpisy nowsze niż kursor (id), od najstarszego."""
+        return [n for n in self._store.read() if n.get("id", 0) > cursor]
+
+    def wait(self, cursor: int, timeout: float) -> list:
+        """Czeka (najwyżej timeout sekund) na wpisy nowsze niż kursor i je zwraca."""
+        with self._changed:
+            self._changed.wait_for(lambda: self._last_id > cursor, timeout)
+        return self.since(cursor)
+
+    def clear(self) -> None:
+        """Czyści historię; kursory nie są resetowane, więc klienci nie dostaną duplikatów."""
+        with self._changed:
+            self._store.clear()
+            self._changed.notify_all()
@@ -0,0 +1,93 @@
+# reminder_cache.py
+
+import os
+import json
+import time
+import threading
+from typing import Optional
+
+import config
+
+
+class ReminderCache:
+    """
+    Trwały cache tekstów przypomnień wygenerowanych przez LLM.
+
+    Wpis jest zapamiętany pod id wydarzenia i ważny tylko wtedy, gdy tytuł,
+    termin i model są takie same jak przy generowaniu — zmiana wydarzenia
+    w kalendarzu unieważnia wpis. Wpisy starsze niż TTL są usuwane, a przy
+    przekroczeniu limitu wyrzucamy najdawniej użyte.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float, max_entries: int):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = self._load()
+
+    def _load(self) -> dict:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+            return entries if isinstance(entries, dict) else {}
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def _save(self) -> None:
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def _evict(self, now: float) -> None:
+        expired = [k for k, e in self._entries.items() if now - e.get("created_at", 0) > self.ttl_seconds]
+        for key in expired:
+            del self._entries[key]
+        overflow = len(self._entries) - self.max_entries
+        if overflow > 0:
+            oldest = sorted(self._entries, key=lambda k: self._entries[k].get("used_at", 0))
+            for key in oldest[:overflow]:
+                del self._entries[key]
+
+    def get(self, event_id: str, summary: str, start: str, model: str) -> Optional[str]:
+        """Zwraca zapamiętany tekst albo None, jeśli brak wpisu, wygasł lub wydarzenie się zmieniło."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(event_id)
+            if not entry:
+                return None
+            if (entry.get("summary"), entry.get("start"), entry.get("model")) != (summary, start, model):
+                return None
+            if now - entry.get("created_at", 0) > self.ttl_seconds:
+                return None
+            entry["used_at"] = now
+            return entry["message"]
+
+    def put(self, event_id: str, summary: str, start: str, model: str, message: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._entries[event_id] = {
+                "summary": summary,
+                "start": start,
+                "model": model,
+                "message": message,
+                "created_at": now,
+                "used_at": now,
+            }
+            self._evict(now)
+            self._save()
+
+    def invalidate(self, event_id: str) -> None:
+        with self._lock:
+            if self._entries.pop(event_id, None) is not None:
+                self._save()
+
+
+reminder_cache = ReminderCache(
+    config.REMINDER_CACHE_FILE,
+    ttl_seconds=config.REMINDER_CACHE_TTL_HOURS * 3600,
+    max_entries=config.REMINDER_CACHE_MAX_ENTRIES,
+)
@@ -0,0 +1,145 @@
+# reminder_scheduler.py
+
+import threading
+from datetime import datetime, timezone, timedelta
+
+from apscheduler.schedulers.background import BackgroundScheduler
+from dateutil import parser
+
+import config
+from storage import get_store
+from audio_handler import handle_audio, synthesize_pcm
+from reminders import get_reminders
+import residents
+
+
+class ReminderScheduler:
+    """
+    Przypomnienia wysyłane bez udziału użytkownika.
+
+    Co CHECK_INTERVAL_MINUTES pobieramy najbliższe wydarzenia z kalendarza
+    każdego podopiecznego obsługiwanego przez proces i z wyprzedzeniem
+    przygotowujemy tekst oraz audio (TTS) dla tych, które wypadają w ciągu
+    SCHEDULER_LOOKAHEAD_MINUTES. Osobne, częste zadanie sprawdza tylko dane
+    w pamięci i doręcza przypomnienie, gdy jego czas mieści się w oknie
+    ± REMINDER_TOLERANCE sekund — w momencie doręczenia nie ma już żadnych
+    wywołań LLM ani TTS. Doręczone przypomnienia zapisujemy w pliku, żeby
+    nie powtarzać ich po restarcie. Przypomnienie trafia do powiadomień
+    podopiecznego, do którego należy kalendarz.
+    """
+
+    def __init__(self, delivered_path: str = config.DELIVERED_REMINDERS_FILE):
+        self.delivered_path = delivered_path
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._store = get_store(delivered_path, default=dict, indent=None)
+        self._delivered = self._store.read()
+        self._scheduler = None
+
+    # ——————————————————————————————————————————————————————————
+    # Doręczone przypomnienia (deduplikacja)
+    # ——————————————————————————————————————————————————————————
+
+    def _mark_delivered(self, key: str, now: datetime) -> None:
+        # Starsze wpisy nie są już potrzebne do deduplikacji
+        cutoff = now - timedelta(days=2)
+        self._delivered = self._store.update(lambda delivered: {
+            k: v for k, v in {**delivered, key: now.isoformat()}.items() if parser.isoparse(v) > cutoff
+        })
+
+    # ——————————————————————————————————————————————————————————
+    # Zadania
+    # ——————————————————————————————————————————————————————————
+
+    def prepare(self) -> None:
+        """Pobiera kalendarz i przygotowuje tekst + audio nadchodzących przypomnień."""
+        now = datetime.now(timezone.utc)
+        horizon = now + timedelta(minutes=config.SCHEDULER_LOOKAHEAD_MINUTES)
+        lead = timedelta(minutes=config.REMINDER_LEAD_MINUTES)
+
+        upcoming = {}
+        for resident_id in residents.served_ids():
+            calendar = residents.get_resident(resident_id).calendar
+            if calendar is None:
+                continue
+            try:
+                reminders = get_reminders(config.SCHEDULER_MAX_EVENTS, calendar)
+            except Exception as e:
+                print(f"[scheduler] Nie udało się pobrać przypomnień ({resident_id}): {e}")
+                continue
+
+            for reminder in reminders:
+                start = parser.isoparse(reminder["start"])
+                if start.tzinfo is None:
+                    start = start.replace(tzinfo=timezone.utc)
+                fire_at = start - lead
+                key = f"{reminder['id']}@{reminder['start']}"
+                # Klucze podopiecznego domyślnego bez prefiksu — zgodne z wcześniej zapisanymi
+                if resident_id != config.DEFAULT_RESIDENT_ID:
+                    key = f"{resident_id}/{key}"
+                if key in self._delivered or fire_at > horizon:
+                    continue
+
+                # Rozgrzewamy cache TTS — przy doręczeniu audio będzie już na dysku
+                try:
+                    synthesize_pcm(reminder["message"])
+                except Exception as e:
+                    print(f"[scheduler] TTS dla '{reminder['summary']}' nie powiodło się: {e}")
+                upcoming[key] = {**reminder, "fire_at": fire_at, "resident": resident_id}
+
+        with self._lock:
+            # W międzyczasie część przypomnień mogła zostać doręczona
+            self._pending = {k: v for k, v in upcoming.items() if k not in self._delivered}
+        print(f"[scheduler] Prepared {len(upcoming)} reminders.")
+
+    def deliver_due(self) -> None:
+        """Doręcza przypomnienia, których czas mieści się w oknie tolerancji."""
+        now = datetime.now(timezone.utc)
+        tolerance = timedelta(seconds=config.REMINDER_TOLERANCE)
+
+        due = []
+        with self._lock:
+            for key, reminder in list(self._pending.items()):
+                if reminder["fire_at"] - tolerance <= now <= reminder["fire_at"] + tolerance:
+                    due.append((key, self._pending.pop(key)))
+                elif now > reminder["fire_at"] + tolerance:
+                    # Przegapione okno (np. serwer był wyłączony) — nie doręczamy z opóźnieniem
+                    print(f"[scheduler] Missed reminder: {reminder['summary']}")
+                    self._pending.pop(key)
+                    self._mark_delivered(key, now)
+
+            for key, _ in due:
+                self._mark_delivered(key, now)
+
+        for _, reminder in due:
+            self._deliver(reminder)
+
+    def _deliver(self, reminder: dict) -> None:
+        print(f"[scheduler] Delivering reminder: {reminder['message']}")
+        residents.get_resident(reminder["resident"]).notifications.append(event="reminder", description=reminder["message"])
+        # Głośnik serwera należy do podopiecznego domyślnego
+        if config.PLAY_ON_BACKEND and reminder["resident"] == config.DEFAULT_RESIDENT_ID:
+            handle_audio(reminder["message"], play_on=True)
+
+    # ——————————————————————————————————————————————————————————
+    # Uruchamianie
+    # ——————————————————————————————————————————————————————————
+
+    def start(self) -> None:
+        if self._scheduler is not None:
+            return
+        tick = max(1, min(config.SCHEDULER_TICK_SECONDS, config.REMINDER_TOLERANCE))
+        self._scheduler = BackgroundScheduler(daemon=True)
+        self._scheduler.add_job(self.prepare, "interval", minutes=config.CHECK_INTERVAL_MINUTES,
+                                next_run_time=datetime.now(timezone.utc), max_instances=1, coalesce=True)
+        self._scheduler.add_job(self.deliver_due, "interval", seconds=tick, max_instances=1, coalesce=True)
+        self._scheduler.start()
+        print(f"[scheduler] Started (check every {config.CHECK_INTERVAL_MINUTES} min, tick {tick} s).")
+
+    def shutdown(self) -> None:
+        if self._scheduler is not None:
+            self._scheduler.shutdown(wait=False)
+            self._scheduler = None
+
+
+reminder_scheduler = ReminderScheduler()
@@ -0,0 +1,150 @@
+# reminders.py
+
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from openai import OpenAI
+
+import config
+from reminder_cache import reminder_cache
+from calendar_service import CalendarEventCache, calendar_events
+
+# ——————————————————————————————————————————————————————————
+# Inicjalizacja klienta OpenAI
+# ——————————————————————————————————————————————————————————
+client = OpenAI(api_key=config.OPENAI_API_KEY)
+
+# ——————————————————————————————————————————————————————————
+# Funkcje pomocnicze
+# ——————————————————————————————————————————————————————————
+
+def generate_event_message(summary: str, start: str) -> str:
+    prompt = (
+    f"Create a short, friendly reminder for the event '{summary}', "
+    f"which will take place on {start}."
+)
+    resp = client.chat.completions.create(
+        model=config.OPENAI_CHAT_MODEL_CALENDAR,
+        messages=[
+            {"role": "system", "content": "You are a helpful assistant for old people."},
+            {'role': 'user', 'content': prompt}
+        ],
+        timeout=config.REMINDER_LLM_TIMEOUT
+    )
+    return resp.choices[0].message.content.strip()
+
+
+def fallback_event_message(summary: str, start: str) -> str:
+    """Prosty tekst zastępczy, gdy LLM nie zdążył wygenerować przypomnienia."""
+    return f"Reminder: '{summary}' is coming up on {start}."
+
+
+def get_event_message(event_id: str, summary: str, start: str) -> str:
+    """Tekst przypomnienia z cache; LLM wołamy tylko dla nowych lub zmienionych wydarzeń."""
+    model = config.OPENAI_CHAT_MODEL_CALENDAR
+    text = reminder_cache.get(event_id, summary, start, model)
+    if text is None:
+        text = generate_event_message(summary, start)
+        reminder_cache.put(event_id, summary, start, model, text)
+    return text
+
+
+# Ograniczona pula do równoległego generowania przypomnień
+_reminder_pool = ThreadPoolExecutor(
+    max_workers=config.REMINDER_CONCURRENCY,
+    thread_name_prefix="reminder"
+)
+
+
+def get_event_messages(events: list) -> tuple:
+    """
+    Generuje teksty dla listy (event_id, summary, start) równolegle.
+    Kolejność wyników odpowiada kolejności wejścia. Wydarzenia, dla których
+    LLM nie odpowiedział w czasie REMINDER_LLM_TIMEOUT, dostają tekst zastępczy
+    (wygenerowany później tekst i tak trafi do cache).
+    Zwraca (teksty, complete) — complete=False, jeśli użyto tekstu zastępczego.
+    """
+    model = config.OPENAI_CHAT_MODEL_CALENDAR
+    messages = [reminder_cache.get(event_id, summary, start, model) for event_id, summary, start in events]
+
+    futures = {
+        _reminder_pool.submit(get_event_message, *events[i]): i
+        for i, text in enumerate(messages) if text is None
+    }
+    if not futures:
+        return messages, True
+
+    complete = True
+    done, _ = wait(futures, timeout=config.REMINDER_LLM_TIMEOUT)
+    for future, i in futures.items():
+        if future in done and future.exception() is None:
+            messages[i] = future.result()
+        else:
+            _, summary, start = events[i]
+            print(f"Reminder generation for '{summary}' failed or timed out: {future.exception() if future in done else 'timeout'}")
+            messages[i] = fallback_event_message(summary, start)
+            complete = False
+    return messages, complete
+
+
+def _build_reminders(items: list) -> tuple:
+    print(f"Fetched {len(items)} events.")
+
+    events = []
+    for ev in items:
+        summary   = ev.get('summary', '(Brak tytułu)')
+        start_str = ev['start'].get('dateTime', ev['start'].get('date'))
+        event_id  = ev.get('id', f"{summary}@{start_str}")
+        print(f"Event: {summary} at {start_str}")
+        events.append((event_id, summary, start_str))
+
+    # Generujemy teksty dla wszystkich wydarzeń naraz (kolejność zachowana)
+    messages, complete = get_event_messages(events)
+
+    reminders = []
+    for (event_id, summary, start_str), text in zip(events, messages):
+        print(f"Generated message: {text}")
+        reminders.append({
+            "id":      event_id,
+            "summary": summary,
+            "start":   start_str,
+            "message": text
+        })
+
+    return reminders, complete
+
+
+# ——————————————————————————————————————————————————————————
+# Wspólne API dla trasy /api/reminders i narzędzia agenta
+# ——————————————————————————————————————————————————————————
+# Wynik jest zapamiętywany dla konkretnego zestawu wydarzeń (id, tytuł, termin),
+# więc dopóki kalendarz się nie zmieni, kolejne zapytania nie robią nic poza
+# przejrzeniem wydarzeń w pamięci. Wyniki z tekstami zastępczymi nie trafiają
+# do cache, żeby przy następnym zapytaniu podstawić już wygenerowane teksty.
+
+_results_lock = threading.Lock()
+_results = {}
+_MAX_RESULTS = 32
+
+
+def get_reminders(count: int = 1, calendar: CalendarEventCache = calendar_events) -> list:
+    """Zwraca `count` najbliższych przypomnień z kalendarza: [{id, summary, start, message}]."""
+    items = calendar.upcoming(count, days=10)
+    # Kalendarz (obiekt) jest częścią klucza — podopieczni nie dzielą wyników
+    key = (calendar,) + tuple(
+        (ev.get('id'), ev.get('summary'), ev['start'].get('dateTime', ev['start'].get('date')))
+        for ev in items
+    )
+    with _results_lock:
+        cached = _results.get(key)
+    if cached is not None:
+        return [dict(r) for r in cached]
+
+    reminders, complete = _build_reminders(items)
+    if complete:
+        with _results_lock:
+            # Klucze dla starych stanów kalendarza już nie wrócą — co jakiś czas czyścimy
+            if len(_results) >= _MAX_RESULTS:
+                _results.clear()
+            _results[key] = reminders
+    return [dict(r) for r in reminders]
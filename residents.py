@@ -0,0 +1,179 @@
+# residents.py
+
+import os
+import re
+import threading
+import zlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+import config
+from anomalies import AnomalyIndex
+from band_store import BandDataStore
+from calendar_service import CalendarEventCache, FakeCalendarService, calendar_events
+from health_monitor import HealthMonitor
+from memory import ConversationMemory
+from notifications import NotificationFeed
+from storage import get_store
+from transcripts import TranscriptStore
+from vitals_analytics import VitalsAnalytics
+
+# ——————————————————————————————————————————————————————————
+# Podopieczni — osobny stan (pliki, indeksy, agent) dla każdego mieszkańca
+# ——————————————————————————————————————————————————————————
+# Id podopiecznego bieżącego żądania/tury trafia do ContextVar; narzędzia agenta
+# i trasy biorą z niego swój stan przez current_resident(). Korutyny zlecane do
+# async_runtime i asyncio.to_thread dziedziczą kontekst, więc id „podróżuje”
+# razem z turą rozmowy.
+
+RESIDENT_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+_current_id: ContextVar[str] = ContextVar("resident_id", default=config.DEFAULT_RESIDENT_ID)
+
+
+class Resident:
+    """Komplet stanu jednego podopiecznego, tworzony przy pierwszym użyciu."""
+
+    def __init__(self, resident_id: str):
+        self.id = resident_id
+        is_default = resident_id == config.DEFAULT_RESIDENT_ID
+        self.directory = None if is_default else os.path.join(config.RESIDENTS_DIR, resident_id)
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+        self.band_store = BandDataStore(
+            self._path(config.HISTORY_BAND_DATA_FILE),
+            legacy_path=config.LEGACY_HISTORY_BAND_DATA_FILE if is_default else None,
+        )
+        self.notifications = NotificationFeed(self._path(config.NOTIFICATION_HISTORY_FILE), config.NOTIFICATION_HISTORY_MAX)
+        # Kolejność subskrypcji band_store: indeks anomalii i analityka przed monitorem
+        self.anomaly_index = AnomalyIndex(
+            self.band_store,
+            self._path(config.ANOMALY_ACK_FILE),
+            checkpoint_path=self._path(config.ANOMALY_CHECKPOINT_FILE),
+            checkpoint_every=config.ANOMALY_CHECKPOINT_EVERY,
+        )
+        self.vitals = VitalsAnalytics(self.band_store, config.VITALS_BUFFER_SIZE)
+        self.health_monitor = HealthMonitor(self.band_store, self.anomaly_index, self.vitals, self.notifications)
+
+        self.transcripts = TranscriptStore(
+            self._path(config.TRANSCRIPT_HISTORY_FILE),
+            recent_size=config.TRANSCRIPT_RECENT_TURNS,
+            max_bytes=int(config.TRANSCRIPT_LOG_MAX_MB * 1024 * 1024),
+            backups=config.TRANSCRIPT_LOG_BACKUPS,
+            max_age_days=config.TRANSCRIPT_MAX_AGE_DAYS,
+            legacy_path=config.LEGACY_TRANSCRIPT_HISTORY_FILE if is_default else None,
+        )
+        self.memory = ConversationMemory(self.transcripts, self._path(config.MEMORY_FILE))
+
+        # Rutyna i leki tylko własne — bez pliku podopieczny ma pusty kontekst, nie cudze leki
+        self.routine_store = get_store(self._path(config.DAILY_ROUTINE_FILE), default=dict, watch=True)
+        self.medications_store = get_store(self._path(config.MEDICATIONS_FILE), default=dict, watch=True)
+
+        # Kalendarz tylko własny — podopieczny bez niego nie widzi cudzych wydarzeń
+        self.calendar = calendar_events if is_default else self._own_calendar()
+
+        # Cache promptu i agenta (voice_agents.build_main_agent)
+        self.prompt_cache = {"key": None, "text": ""}
+        self.agent_cache = {"key": None, "agent": None}
+        self.agent_lock = threading.Lock()
+
+    def _path(self, path: str) -> str:
+        if self.directory is None:
+            return path
+        return os.path.join(self.directory, os.path.basename(path))
+
+    def _own_calendar(self) -> Optional[CalendarEventCache]:
+        if config.CALENDAR_BACKEND == "fake":
+            path = self._path(config.FAKE_CALENDAR_FILE)
+            if not os.path.exists(path):
+                return None
+            service = FakeCalendarService(path)
+            return CalendarEventCache(service_factory=lambda: service)
+        settings = get_store(self._path(config.RESIDENT_CALENDAR_FILE), default=dict).read()
+        calendar_id = settings.get("calendar_id")
+        return CalendarEventCache(calendar_id=calendar_id) if calendar_id else None
+
+
+_residents: Dict[str, Resident] = {}
+_residents_lock = threading.Lock()
+# Osobna blokada tworzenia dla każdego podopiecznego — wczytywanie stanu jednego
+# (skan historii, indeksy) nie wstrzymuje pierwszych żądań pozostałych
+_creation_locks: Dict[str, threading.Lock] = {}
+
+
+def is_valid_id(resident_id: str) -> bool:
+    return bool(RESIDENT_ID_PATTERN.match(resident_id or ""))
+
+
+def is_known(resident_id: str) -> bool:
+    """Domyślny, z listy RESIDENTS albo z istniejącym katalogiem RESIDENTS_DIR/<id>."""
+    if resident_id == config.DEFAULT_RESIDENT_ID or resident_id in config.RESIDENTS:
+        return True
+    return is_valid_id(resident_id) and os.path.isdir(os.path.join(config.RESIDENTS_DIR, resident_id))
+
+
+def is_served_here(resident_id: str) -> bool:
+    """Czy ten proces obsługuje podopiecznego (WORKER_RESIDENTS / WORKER_SHARD)."""
+    if config.WORKER_RESIDENTS and resident_id not in config.WORKER_RESIDENTS:
+        return False
+    if config.WORKER_SHARD:
+        index, count = (int(x) for x in config.WORKER_SHARD.split("/"))
+        return zlib.crc32(resident_id.encode("utf-8")) % count == index
+    return True
+
+
+def served_ids() -> List[str]:
+    """Znani podopieczni tego procesu: domyślny, z listy RESIDENTS i z katalogiem w RESIDENTS_DIR."""
+    others = {r for r in config.RESIDENTS if is_valid_id(r)}
+    if os.path.isdir(config.RESIDENTS_DIR):
+        others |= {
+            name for name in os.listdir(config.RESIDENTS_DIR)
+            if is_valid_id(name) and os.path.isdir(os.path.join(config.RESIDENTS_DIR, name))
+        }
+    others.discard(config.DEFAULT_RESIDENT_ID)
+    ids = [config.DEFAULT_RESIDENT_ID] + sorted(others)
+    return [resident_id for resident_id in ids if is_served_here(resident_id)]
+
+
+def get_resident(resident_id: Optional[str] = None) -> Resident:
+    """
+    Stan podopiecznego (domyślnego, jeśli id nie podano); tworzony przy pierwszym użyciu.
+    Nieznany podopieczny (is_known) to LookupError — nie zakładamy mu katalogu.
+    """
+    resident_id = resident_id or config.DEFAULT_RESIDENT_ID
+    resident = _residents.get(resident_id)
+    if resident is not None:
+        return resident
+    if not is_known(resident_id):
+        raise LookupError(f"Nieznany podopieczny: {resident_id}")
+
+    with _residents_lock:
+        creation_lock = _creation_locks.setdefault(resident_id, threading.Lock())
+    with creation_lock:
+        resident = _residents.get(resident_id)
+        if resident is None:
+            resident = Resident(resident_id)
+            with _residents_lock:
+                _residents[resident_id] = resident
+        return resident
+
+
+def current_resident() -> Resident:
+    """Podopieczny bieżącego żądania lub tury rozmowy."""
+    return get_resident(_current_id.get())
+
+
+def activate(resident_id: str) -> None:
+    """Ustawia podopiecznego dla bieżącego kontekstu (np. wątku obsługującego żądanie)."""
+    _current_id.set(resident_id)
+
+
+@contextmanager
+def use_resident(resident_id: str):
+    token = _current_id.set(resident_id)
+    try:
+        yield get_resident(resident_id)
+    finally:
+        _current_id.reset(token)
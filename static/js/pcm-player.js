@@ -0,0 +1,66 @@
+// pcm-player.js
+
+// Odtwarza strumień surowego PCM (int16, mono) kawałek po kawałku:
+// dźwięk startuje po pierwszym kawałku, a kolejne są doklejane bez przerw.
+class PcmStreamPlayer {
+  constructor(sampleRate = 24000) {
+    this.sampleRate = sampleRate;
+    this.context = null;
+    this.nextTime = 0;
+    this.leftover = null;  // nieparzysty bajt z poprzedniego kawałka
+  }
+
+  start() {
+    if (!this.context) {
+      this.context = new AudioContext({ sampleRate: this.sampleRate });
+    }
+    if (this.context.state === 'suspended') {
+      this.context.resume();
+    }
+    this.nextTime = this.context.currentTime;
+    this.leftover = null;
+  }
+
+  // bytes: Uint8Array z próbkami int16 little-endian
+  addChunk(bytes) {
+    if (this.leftover) {
+      const merged = new Uint8Array(this.leftover.length + bytes.length);
+      merged.set(this.leftover);
+      merged.set(bytes, this.leftover.length);
+      bytes = merged;
+      this.leftover = null;
+    }
+    const usable = bytes.length - (bytes.length % 2);
+    if (usable < bytes.length) {
+      this.leftover = bytes.slice(usable);
+    }
+    if (usable === 0) return;
+
+    const view = new DataView(bytes.buffer, bytes.byteOffset, usable);
+    const samples = new Float32Array(usable / 2);
+    for (let i = 0; i < samples.length; i++) {
+      samples[i] = view.getInt16(i * 2, true) / 32768;
+    }
+
+    const buffer = this.context.createBuffer(1, samples.length, this.sampleRate);
+    buffer.copyToChannel(samples, 0);
+    const source = this.context.createBufferSource();
+    source.buffer = buffer;
+    source.connect(this.context.destination);
+
+    const startAt = Math.max(this.nextTime, this.context.currentTime);
+    source.start(startAt);
+    this.nextTime = startAt + buffer.duration;
+  }
+
+  // Czyta odpowiedź fetch() i odtwarza ją w trakcie pobierania
+  async playResponse(resp) {
+    this.start();
+    const reader = resp.body.getReader();
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      this.addChunk(value);
+    }
+  }
+}
@@ -0,0 +1,63 @@
+// pcm-recorder.js
+
+// Nagrywa mikrofon jako surowy PCM (int16, mono, 24 kHz) przez AudioWorklet
+// (recorder-worklet.js) — serwer nie musi już transkodować WebM.
+class PcmRecorder {
+  constructor(sampleRate = 24000) {
+    this.sampleRate = sampleRate;
+    this.chunks = [];
+    this.onchunk = null;  // opcjonalnie: wywoływane dla każdej paczki Int16Array
+  }
+
+  static isSupported() {
+    return typeof AudioWorkletNode !== 'undefined';
+  }
+
+  async start() {
+    this.stream = await navigator.mediaDevices.getUserMedia({
+      audio: { channelCount: 1, echoCancellation: true, noiseSuppression: true }
+    });
+    // Przeglądarka sama przepróbkuje mikrofon do 24 kHz; worklet radzi sobie też z innymi częstotliwościami
+    this.context = new AudioContext({ sampleRate: this.sampleRate });
+    await this.context.audioWorklet.addModule('/static/js/recorder-worklet.js');
+
+    this.source = this.context.createMediaStreamSource(this.stream);
+    this.node = new AudioWorkletNode(this.context, 'recorder-processor', {
+      processorOptions: { targetRate: this.sampleRate }
+    });
+    this.chunks = [];
+    this.node.port.onmessage = (e) => {
+      if (e.data === 'flushed') {
+        if (this.onflushed) this.onflushed();
+        return;
+      }
+      this.chunks.push(e.data);
+      if (this.onchunk) this.onchunk(e.data);
+    };
+    this.source.connect(this.node);
+    // Węzeł musi być podłączony do wyjścia, żeby był przetwarzany (wyjście jest ciche)
+    this.node.connect(this.context.destination);
+  }
+
+  // Kończy nagrywanie i zwraca całe nagranie jako Int16Array
+  async stop() {
+    await new Promise(resolve => {
+      this.onflushed = resolve;
+      this.node.port.postMessage('flush');
+    });
+    this.source.disconnect();
+    this.node.disconnect();
+    this.stream.getTracks().forEach(track => track.stop());
+    await this.context.close();
+
+    const total = this.chunks.reduce((sum, c) => sum + c.length, 0);
+    const pcm = new Int16Array(total);
+    let offset = 0;
+    for (const chunk of this.chunks) {
+      pcm.set(chunk, offset);
+      offset += chunk.length;
+    }
+    this.chunks = [];
+    return pcm;
+  }
+}
@@ -1,16 +1,65 @@
 // recorder-worklet.js
 
+// Zbiera próbki z mikrofonu, miksuje do mono, zmniejsza częstotliwość do
+// targetRate (domyślnie 24 kHz) i wysyła do głównego wątku paczki Int16Array.
 class RecorderProcessor extends AudioWorkletProcessor {
-    constructor() {
+    constructor(options) {
       super();
+      const opts = (options && options.processorOptions) || {};
+      this.targetRate = opts.targetRate || 24000;
+      // sampleRate to globalna częstotliwość kontekstu w AudioWorkletGlobalScope
+      this.ratio = Math.max(1, sampleRate / this.targetRate);
+      this.batch = new Int16Array(opts.batchSize || Math.round(this.targetRate / 10));  // ~100 ms
+      this.filled = 0;
+      // stan uśredniania (filtr dolnoprzepustowy "box" przy decymacji)
+      this.phase = 0;
+      this.acc = 0;
+      this.count = 0;
+
+      this.port.onmessage = (e) => {
+        if (e.data === 'flush') {
+          this.flush();
+          this.port.postMessage('flushed');
+        }
+      };
     }
-  
+
+    flush() {
+      if (this.filled > 0) {
+        const out = this.batch.slice(0, this.filled);
+        this.port.postMessage(out, [out.buffer]);
+        this.filled = 0;
+      }
+    }
+
+    emit(value) {
+      const clamped = Math.max(-1, Math.min(1, value));
+      this.batch[this.filled++] = clamped < 0 ? clamped * 0x8000 : clamped * 0x7fff;
+      if (this.filled === this.batch.length) {
+        this.flush();
+      }
+    }
+
     process(inputs, outputs, parameters) {
-      // inputs[0] to tablica kanałów, inputs[0][0] to Float32Array z próbkami mono
-      const inputChannelData = inputs[0][0];
-      if (inputChannelData) {
-        // wysyłamy próbki do głównego wątku
-        this.port.postMessage(inputChannelData);
+      // inputs[0] to tablica kanałów z Float32Array próbek
+      const channels = inputs[0];
+      if (channels && channels.length > 0) {
+        const length = channels[0].length;
+        for (let i = 0; i < length; i++) {
+          let sample = 0;
+          for (let c = 0; c < channels.length; c++) {
+            sample += channels[c][i];
+          }
+          this.acc += sample / channels.length;
+          this.count++;
+          this.phase += 1;
+          if (this.phase >= this.ratio) {
+            this.phase -= this.ratio;
+            this.emit(this.acc / this.count);
+            this.acc = 0;
+            this.count = 0;
+          }
+        }
       }
       // true, żeby procesor pozostał aktywny
       return true;
@@ -18,4 +67,3 @@ class RecorderProcessor extends AudioWorkletProcessor {
   }
   
   registerProcessor('recorder-processor', RecorderProcessor);
-  
\ No newline at end of file
@@ -0,0 +1,114 @@
+# storage.py
+
+import os
+import json
+import tempfile
+import threading
+from typing import Any, Callable, Dict, Optional
+
+
+class JsonStore:
+    """
+    Plik JSON z pamięcią podręczną (write-through).
+
+    Odczyty są obsługiwane z pamięci — plik parsujemy tylko raz (albo ponownie,
+    gdy przy watch=True zmieni się jego mtime/rozmiar, np. po ręcznej edycji).
+    Każda zmiana działa pod blokadą pliku i zapisuje go atomowo (plik tymczasowy
+    + os.replace), więc równoległe zapisy nie gubią wpisów, a czytelnik nigdy
+    nie zobaczy uciętego pliku.
+
+    Zmiany są copy-on-write: read() zwraca wartość, której nie wolno modyfikować,
+    a update() dostaje ją i zwraca nową.
+    """
+
+    def __init__(self, path: str, default: Callable[[], Any] = list, indent: Optional[int] = 2, watch: bool = False):
+        self.path = path
+        self.default = default
+        self.indent = indent
+        self.watch = watch
+        self.version = 0
+        self._lock = threading.RLock()
+        self._signature = None
+        self._value = self._load()
+
+    def _file_signature(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _load(self) -> Any:
+        self._signature = self._file_signature()
+        self.version += 1
+        if self._signature is None:
+            return self.default()
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Nie udało się wczytać {self.path}: {e}")
+            return self.default()
+        return value if isinstance(value, type(self.default())) else self.default()
+
+    def _write(self, value: Any) -> None:
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(self.path) + ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(value, f, ensure_ascii=False, indent=self.indent)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._value = value
+        self._signature = self._file_signature()
+        self.version += 1
+
+    def read(self) -> Any:
+        """Aktualna zawartość (z pamięci)."""
+        if self.watch and self._file_signature() != self._signature:
+            with self._lock:
+                if self._file_signature() != self._signature:
+                    self._value = self._load()
+        return self._value
+
+    def update(self, fn: Callable[[Any], Any]) -> Any:
+        """Atomowo zamienia zawartość na fn(obecna) i zapisuje plik; zwraca nową wartość."""
+        with self._lock:
+            value = fn(self.read())
+            self._write(value)
+            return value
+
+    def write(self, value: Any) -> None:
+        with self._lock:
+            self._write(value)
+
+    def append(self, item: Any) -> None:
+        """Dopisuje element do listy."""
+        self.update(lambda items: items + [item])
+
+    def clear(self) -> None:
+        """Usuwa plik i wraca do wartości domyślnej."""
+        with self._lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            self._value = self.default()
+            self._signature = None
+            self.version += 1
+
+
+# Jeden magazyn (i jedna blokada) na plik — moduły dzielą ten sam obiekt
+_stores: Dict[str, JsonStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(path: str, **kwargs) -> JsonStore:
+    """Zwraca wspólny JsonStore dla pliku (tworzy go przy pierwszym użyciu)."""
+    key = os.path.abspath(path)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = JsonStore(path, **kwargs)
+        return store
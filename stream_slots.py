@@ -0,0 +1,37 @@
+# stream_slots.py
+
+import threading
+
+import config
+
+# ——————————————————————————————————————————————————————————
+# Limit długotrwałych połączeń (SSE, WebSocket)
+# ——————————————————————————————————————————————————————————
+# W serwerze wątkowym każdy otwarty strumień powiadomień i każda sesja
+# Socket.IO zajmuje wątek na cały czas połączenia. Bez limitu kilkanaście
+# otwartych ekranów wyczerpałoby pulę i /api/band_data czekałby w kolejce.
+# Ponad SERVER_MAX_STREAMS połączeń nowe są odrzucane (SSE — HTTP 503,
+# a strona przechodzi na odpytywanie), więc reszta wątków zostaje dla
+# krótkich żądań.
+
+
+class StreamSlots:
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._lock = threading.Lock()
+        self.in_use = 0
+
+    def acquire(self) -> bool:
+        """Zajmuje miejsce dla strumienia; False, gdy limit jest wyczerpany."""
+        with self._lock:
+            if self.in_use >= self.limit:
+                return False
+            self.in_use += 1
+            return True
+
+    def release(self) -> None:
+        with self._lock:
+            self.in_use = max(0, self.in_use - 1)
+
+
+stream_slots = StreamSlots(config.SERVER_MAX_STREAMS)
@@ -0,0 +1,10 @@
+# tests/conftest.py
+
+import os
+import sys
+
+# Moduły aplikacji leżą w katalogu głównym repozytorium
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Klient OpenAI wymaga klucza już przy imporcie; testy nie wykonują żadnych wywołań
+os.environ.setdefault("OPENAI_API_KEY", "test")
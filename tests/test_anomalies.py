@@ -0,0 +1,53 @@
+# tests/test_anomalies.py
+
+from anomalies import AnomalyIndex
+from band_store import BandDataStore
+
+
+def _open_ids(index):
+    return [r["id"] for r in index.unacknowledged()]
+
+
+def test_restart_scans_only_records_after_checkpoint(tmp_path, monkeypatch):
+    store = BandDataStore(str(tmp_path / "band.jsonl"))
+    store.append_many([{"heart_rate": 60}] * 10 + [{"heart_rate": 30}])
+    paths = dict(ack_path=str(tmp_path / "acks.jsonl"), checkpoint_path=str(tmp_path / "checkpoint.json"))
+    assert _open_ids(AnomalyIndex(store, **paths)) == [10]
+
+    store = BandDataStore(str(tmp_path / "band.jsonl"))
+    store.append_many([{"heart_rate": 60}, {"spo2": 80}])
+    scanned = []
+    iter_after = store.iter_after
+    monkeypatch.setattr(store, "iter_after", lambda record_id: scanned.append(record_id) or iter_after(record_id))
+    index = AnomalyIndex(store, **paths)
+    assert scanned == [10]
+    assert _open_ids(index) == [10, 12]
+
+
+def test_acknowledged_anomalies_stay_closed_after_restart(tmp_path):
+    store = BandDataStore(str(tmp_path / "band.jsonl"))
+    store.append_many([{"heart_rate": 30}, {"fall_detected": True}])
+    paths = dict(ack_path=str(tmp_path / "acks.jsonl"), checkpoint_path=str(tmp_path / "checkpoint.json"))
+    assert AnomalyIndex(store, **paths).acknowledge(ids=[0]) == 1
+    assert _open_ids(AnomalyIndex(store, **paths)) == [1]
+
+
+def test_checkpoint_from_other_history_is_ignored(tmp_path):
+    paths = dict(ack_path=str(tmp_path / "acks.jsonl"), checkpoint_path=str(tmp_path / "checkpoint.json"))
+    store = BandDataStore(str(tmp_path / "band.jsonl"))
+    store.append_many([{"heart_rate": 60}] * 5)
+    AnomalyIndex(store, **paths)
+
+    # Historia wyczyszczona — punkt kontrolny wskazuje id, którego już nie ma
+    (tmp_path / "band.jsonl").unlink()
+    store = BandDataStore(str(tmp_path / "band.jsonl"))
+    store.append({"heart_rate": 30})
+    assert _open_ids(AnomalyIndex(store, **paths)) == [0]
+
+
+def test_iter_after_skips_older_records(tmp_path):
+    store = BandDataStore(str(tmp_path / "band.jsonl"))
+    store.append_many({"heart_rate": 60 + i} for i in range(7))
+    assert [r["id"] for r in store.iter_after(3)] == [4, 5, 6]
+    assert [r["id"] for r in store.iter_after(-1)] == list(range(7))
+    assert list(store.iter_after(6)) == []
@@ -0,0 +1,36 @@
+# tests/test_audio_decode.py
+
+import numpy as np
+import pytest
+
+from audio_decode import SAMPLE_RATE, decode_upload
+
+SAMPLES = np.array([0, 1, -2, 1000, -32768, 32767], dtype=np.int16)
+
+
+def test_pcm_is_little_endian():
+    out = decode_upload(SAMPLES.astype("<i2").tobytes(), "audio/pcm", {"rate": str(SAMPLE_RATE)})
+    np.testing.assert_array_equal(out, SAMPLES)
+
+
+def test_l16_is_big_endian():
+    out = decode_upload(SAMPLES.astype(">i2").tobytes(), "audio/l16", {"rate": str(SAMPLE_RATE)})
+    np.testing.assert_array_equal(out, SAMPLES)
+    assert out.dtype == np.dtype("<i2")
+
+
+def test_missing_rate_defaults_to_24k():
+    out = decode_upload(SAMPLES.tobytes(), "audio/pcm")
+    np.testing.assert_array_equal(out, SAMPLES)
+
+
+def test_other_rate_is_resampled():
+    audio = np.zeros(48000, dtype=np.int16)
+    out = decode_upload(audio.tobytes(), "audio/pcm", {"rate": "48000"})
+    assert out.size == SAMPLE_RATE
+
+
+@pytest.mark.parametrize("rate", ["abc", "0", "-16000", "1e9"])
+def test_invalid_rate_is_rejected(rate):
+    with pytest.raises(ValueError):
+        decode_upload(SAMPLES.tobytes(), "audio/pcm", {"rate": rate})
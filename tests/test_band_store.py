@@ -0,0 +1,57 @@
+# tests/test_band_store.py
+
+import pytest
+
+from band_store import BandDataStore, validate_band_record
+
+
+def _record(hr: int) -> dict:
+    return {"heart_rate": hr, "spo2": 97, "fall_detected": False}
+
+
+def test_ids_and_recent_tail(tmp_path):
+    store = BandDataStore(str(tmp_path / "band.jsonl"))
+    first = store.append(_record(60))
+    batch = store.append_many(_record(61 + i) for i in range(5))
+    assert first["id"] == 0
+    assert [r["id"] for r in batch] == [1, 2, 3, 4, 5]
+    assert [r["heart_rate"] for r in store.recent(2)] == [64, 65]
+    assert store.last()["id"] == 5
+    assert len(store) == 6
+
+
+def test_index_is_rebuilt_after_restart(tmp_path):
+    path = str(tmp_path / "band.jsonl")
+    store = BandDataStore(path)
+    store.append_many(_record(60 + i) for i in range(3))
+
+    reopened = BandDataStore(path)
+    assert len(reopened) == 3
+    assert reopened.append(_record(90))["id"] == 3
+    assert [r["heart_rate"] for r in reopened.iter_all()] == [60, 61, 62, 90]
+
+
+def test_torn_last_line_is_dropped(tmp_path):
+    path = tmp_path / "band.jsonl"
+    store = BandDataStore(str(path))
+    store.append_many(_record(60 + i) for i in range(2))
+    with open(path, "ab") as f:
+        f.write(b'{"heart_rate": 7')  # zapis przerwany w połowie linii
+
+    reopened = BandDataStore(str(path))
+    assert len(reopened) == 2
+    assert reopened.append(_record(70))["id"] == 2
+    assert [r["id"] for r in reopened.recent(10)] == [0, 1, 2]
+
+
+@pytest.mark.parametrize("measured_at, valid", [
+    ("2025-05-01T08:00:00Z", True),
+    ("2025-05-01T10:00:00+02:00", True),
+    ("2025-05-01T08:00:00", False),
+    ("wczoraj", False),
+    (1714550400, False),
+    ("2999-01-01T00:00:00Z", False),
+])
+def test_measured_at_is_validated(measured_at, valid):
+    error = validate_band_record({"heart_rate": 60, "measured_at": measured_at})
+    assert (error is None) == valid
@@ -0,0 +1,56 @@
+# tests/test_health_monitor.py
+
+import pytest
+
+from anomalies import AnomalyIndex
+from band_store import BandDataStore
+from health_monitor import HealthMonitor
+from notifications import NotificationFeed
+from vitals_analytics import VitalsAnalytics
+
+
+def _build(tmp_path):
+    store = BandDataStore(str(tmp_path / "band.jsonl"))
+    index = AnomalyIndex(store, str(tmp_path / "acks.jsonl"))
+    vitals = VitalsAnalytics(store, capacity=256)
+    feed = NotificationFeed(str(tmp_path / "notifications.json"), max_entries=100)
+    monitor = HealthMonitor(store, index, vitals, feed)
+    return store, monitor, feed
+
+
+@pytest.fixture(autouse=True)
+def auto_notify(monkeypatch):
+    monkeypatch.setattr("config.ANOMALY_AUTO_NOTIFY", True)
+
+
+def _alerts(feed):
+    return [n["description"] for n in feed.since(0) if n["description"].startswith("Automatic alert")]
+
+
+def test_open_condition_is_notified_once(tmp_path):
+    store, monitor, feed = _build(tmp_path)
+    for _ in range(3):
+        store.append({"heart_rate": 40, "spo2": 97})
+    assert len(_alerts(feed)) == 1
+
+    # Inny stan alarmowy to nowe powiadomienie
+    store.append({"heart_rate": 40, "spo2": 80})
+    assert len(_alerts(feed)) == 2
+    store.append_many([{"heart_rate": 40, "spo2": 80}] * 5)
+    assert len(_alerts(feed)) == 2
+
+
+def test_acknowledge_reopens_conditions(tmp_path):
+    store, monitor, feed = _build(tmp_path)
+    store.append({"heart_rate": 40})
+    monitor.acknowledge(note="ok")
+    store.append({"heart_rate": 40})
+    assert len(_alerts(feed)) == 2
+
+
+def test_open_conditions_survive_restart(tmp_path):
+    store, _, feed = _build(tmp_path)
+    store.append({"fall_detected": True})
+    store, _, feed = _build(tmp_path)
+    store.append({"fall_detected": True})
+    assert len(_alerts(feed)) == 1
@@ -0,0 +1,41 @@
+# tests/test_notifications.py
+
+import threading
+
+from notifications import NotificationFeed
+
+
+def test_cursor_returns_only_newer_entries(tmp_path):
+    feed = NotificationFeed(str(tmp_path / "notifications.json"), max_entries=100)
+    first = feed.append("info", "a")
+    second = feed.append("info", "b")
+    assert second["id"] > first["id"]
+    assert [n["description"] for n in feed.since(0)] == ["a", "b"]
+    assert [n["description"] for n in feed.since(first["id"])] == ["b"]
+    assert feed.since(second["id"]) == []
+
+
+def test_history_is_capped(tmp_path):
+    feed = NotificationFeed(str(tmp_path / "notifications.json"), max_entries=3)
+    for i in range(5):
+        feed.append("info", str(i))
+    assert [n["description"] for n in feed.since(0)] == ["2", "3", "4"]
+
+
+def test_ids_keep_growing_after_clear_and_restart(tmp_path):
+    path = str(tmp_path / "notifications.json")
+    feed = NotificationFeed(path, max_entries=100)
+    last = feed.append("info", "a")["id"]
+    feed.clear()
+    assert feed.append("info", "b")["id"] > last
+    assert NotificationFeed(path, max_entries=100).append("info", "c")["id"] > last
+
+
+def test_wait_wakes_up_on_append(tmp_path):
+    feed = NotificationFeed(str(tmp_path / "notifications.json"), max_entries=100)
+    cursor = feed.append("info", "old")["id"]
+    timer = threading.Timer(0.05, feed.append, args=("anomaly", "new"))
+    timer.start()
+    entries = feed.wait(cursor, timeout=5)
+    timer.join()
+    assert [n["description"] for n in entries] == ["new"]
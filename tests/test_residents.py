@@ -0,0 +1,82 @@
+# tests/test_residents.py
+
+import json
+
+import pytest
+
+import config
+import residents
+from calendar_service import calendar_events
+
+
+@pytest.fixture
+def residents_dir(tmp_path, monkeypatch):
+    # Pliki podopiecznego domyślnego powstają w katalogu roboczym
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(config, "RESIDENTS_DIR", str(tmp_path))
+    monkeypatch.setattr(config, "CALENDAR_BACKEND", "fake")
+    monkeypatch.setattr(config, "RESIDENTS", [])
+    monkeypatch.setattr(residents, "_residents", {})
+    monkeypatch.setattr(residents, "_creation_locks", {})
+    return tmp_path
+
+
+def test_resident_without_own_calendar_has_none(residents_dir):
+    assert residents.Resident("bob").calendar is None
+
+
+def test_resident_gets_own_fake_calendar(residents_dir):
+    (residents_dir / "anna").mkdir()
+    (residents_dir / "anna" / config.FAKE_CALENDAR_FILE).write_text(json.dumps([]), encoding="utf-8")
+    calendar = residents.Resident("anna").calendar
+    assert calendar is not None and calendar is not calendar_events
+
+
+def test_default_resident_uses_configured_calendar(residents_dir):
+    assert residents.Resident(config.DEFAULT_RESIDENT_ID).calendar is calendar_events
+
+
+def test_resident_does_not_inherit_shared_medications(residents_dir):
+    (residents_dir / config.MEDICATIONS_FILE).write_text(json.dumps({"drugs": ["x"]}), encoding="utf-8")
+    assert residents.Resident(config.DEFAULT_RESIDENT_ID).medications_store.read() == {"drugs": ["x"]}
+    assert residents.Resident("bob").medications_store.read() == {}
+
+    (residents_dir / "anna").mkdir()
+    (residents_dir / "anna" / config.MEDICATIONS_FILE).write_text(json.dumps({"drugs": ["y"]}), encoding="utf-8")
+    assert residents.Resident("anna").medications_store.read() == {"drugs": ["y"]}
+
+
+def test_unknown_resident_is_not_created(residents_dir):
+    with pytest.raises(LookupError):
+        residents.get_resident("bob")
+    assert not (residents_dir / "bob").exists()
+    assert "bob" not in residents.served_ids()
+
+
+def test_known_residents_come_from_directories_and_roster(residents_dir, monkeypatch):
+    (residents_dir / "anna").mkdir()
+    monkeypatch.setattr(config, "RESIDENTS", ["carl"])
+    assert residents.get_resident("anna").id == "anna"
+    assert residents.get_resident("carl") is residents.get_resident("carl")
+    assert (residents_dir / "carl").is_dir()
+    assert residents.served_ids() == [config.DEFAULT_RESIDENT_ID, "anna", "carl"]
+
+
+def test_shard_assignment_covers_every_resident_once(monkeypatch):
+    monkeypatch.setattr(config, "WORKER_RESIDENTS", [])
+    ids = [f"r{i}" for i in range(50)]
+    owners = []
+    for resident_id in ids:
+        served = []
+        for shard in range(3):
+            monkeypatch.setattr(config, "WORKER_SHARD", f"{shard}/3")
+            if residents.is_served_here(resident_id):
+                served.append(shard)
+        owners.append(served)
+    assert all(len(served) == 1 for served in owners)
+
+
+def test_invalid_ids_are_rejected():
+    assert residents.is_valid_id("anna_1")
+    assert not residents.is_valid_id("../etc")
+    assert not residents.is_valid_id("")
@@ -0,0 +1,48 @@
+# tests/test_transcripts.py
+
+import os
+
+from transcripts import TranscriptStore
+
+
+def _store(path, **kwargs):
+    options = dict(recent_size=4, max_bytes=200, backups=2, max_age_days=30)
+    options.update(kwargs)
+    return TranscriptStore(str(path), **options)
+
+
+def _turn(i: int) -> dict:
+    return {"timestamp": f"2026-01-01T00:00:{i:02d}", "input_transcript": f"q{i}", "output_transcript": f"a{i}"}
+
+
+def test_log_rotates_and_keeps_limited_backups(tmp_path):
+    path = tmp_path / "history.jsonl"
+    store = _store(path)
+    for i in range(30):
+        store.append(_turn(i))
+    # Po rotacji bieżący dziennik powstaje dopiero przy następnym wpisie
+    assert not path.exists() or os.path.getsize(path) <= 200 + 100
+    assert (tmp_path / "history.jsonl.1").exists()
+    assert (tmp_path / "history.jsonl.2").exists()
+    assert not (tmp_path / "history.jsonl.3").exists()
+    assert [t["input_transcript"] for t in store.recent(2)] == ["q28", "q29"]
+
+
+def test_recent_tail_survives_restart_across_rotation(tmp_path):
+    path = tmp_path / "history.jsonl"
+    store = _store(path)
+    for i in range(30):
+        store.append(_turn(i))
+    expected = store.recent(4)
+
+    assert _store(path).recent(4) == expected
+
+
+def test_clear_removes_log_and_backups(tmp_path):
+    path = tmp_path / "history.jsonl"
+    store = _store(path)
+    for i in range(30):
+        store.append(_turn(i))
+    store.clear()
+    assert store.recent(4) == []
+    assert os.listdir(tmp_path) == []
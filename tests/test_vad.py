@@ -0,0 +1,36 @@
+# tests/test_vad.py
+
+import numpy as np
+import pytest
+
+from vad import trim_silence
+
+RATE = 24000
+
+
+def _tone(seconds: float, amplitude: int = 8000) -> np.ndarray:
+    t = np.arange(int(RATE * seconds)) / RATE
+    return (np.sin(2 * np.pi * 220 * t) * amplitude).astype(np.int16)
+
+
+@pytest.mark.parametrize("seconds", [0.01, 0.2, 0.5, 0.62])
+def test_short_speech_shorter_than_padding_is_kept_whole(seconds):
+    audio = _tone(seconds)
+    trimmed, stats = trim_silence(audio, RATE)
+    assert stats["speech_detected"]
+    assert trimmed.size == audio.size
+
+
+def test_short_silence_is_not_speech():
+    trimmed, stats = trim_silence(np.zeros(int(RATE * 0.5), dtype=np.int16), RATE)
+    assert not stats["speech_detected"]
+    assert trimmed.size == 0
+
+
+def test_leading_and_trailing_silence_is_trimmed():
+    silence = np.zeros(RATE * 2, dtype=np.int16)
+    audio = np.concatenate([silence, _tone(1.0), silence])
+    trimmed, stats = trim_silence(audio, RATE)
+    assert stats["speech_detected"]
+    # 1 s mowy + najwyżej VAD_PADDING_MS zapasu z każdej strony
+    assert 1.0 <= trimmed.size / RATE <= 1.7
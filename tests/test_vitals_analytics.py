@@ -0,0 +1,63 @@
+# tests/test_vitals_analytics.py
+
+from datetime import datetime
+
+import pytest
+
+from vitals_analytics import VitalsAnalytics
+
+NOW = 1_800_000_000.0
+
+
+class _Store:
+    def subscribe(self, listener):
+        pass
+
+    def recent(self, count):
+        return []
+
+
+def _record(minutes_ago: float, heart_rate: float) -> dict:
+    received_at = datetime.fromtimestamp(NOW - minutes_ago * 60).astimezone().isoformat()
+    return {"received_at": received_at, "heart_rate": heart_rate, "spo2": 97}
+
+
+@pytest.fixture
+def analytics():
+    vitals = VitalsAnalytics(_Store(), capacity=256)
+    # Spokojna godzina z niewielkim rozrzutem, potem w ostatnich minutach nagły skok
+    vitals.add(_record(m, 60 + (m % 20)) for m in range(60, 5, -1))
+    vitals.add(_record(s / 6, 72 + (s % 2)) for s in range(29, 0, -1))
+    vitals.add([_record(0, 95)])
+    return vitals
+
+
+def test_alerts_use_shortest_window_regardless_of_order(analytics):
+    ascending = analytics.summary([5, 60], now=NOW)
+    descending = analytics.summary([60, 5], now=NOW)
+    assert ascending["alerts"] and descending["alerts"] == ascending["alerts"]
+    assert list(descending["windows"]) == ["5m", "60m"]
+    z_short = descending["windows"]["5m"]["heart_rate"]["z_latest"]
+    z_long = descending["windows"]["60m"]["heart_rate"]["z_latest"]
+    assert round(z_short, 1) != round(z_long, 1)
+    assert descending["alerts"][0]["z"] == round(z_short, 1)
+
+
+@pytest.mark.parametrize("windows", [[], [0], [-5, 60]])
+def test_invalid_windows_are_rejected(analytics, windows):
+    with pytest.raises(ValueError):
+        analytics.summary(windows, now=NOW)
+
+
+def test_buffered_batch_keeps_device_times():
+    vitals = VitalsAnalytics(_Store(), capacity=64)
+    received_at = datetime.fromtimestamp(NOW).astimezone().isoformat()
+    # Bramka przysyła naraz kwadrans pomiarów — tętno rośnie o 1/min
+    vitals.add({
+        "measured_at": datetime.fromtimestamp(NOW - m * 60).astimezone().isoformat(),
+        "received_at": received_at,
+        "heart_rate": 80 - m,
+    } for m in range(15, -1, -1))
+    stats = vitals.summary([15], now=NOW)["windows"]["15m"]["heart_rate"]
+    assert stats["n"] == 16
+    assert stats["slope_per_min"] == pytest.approx(1.0)
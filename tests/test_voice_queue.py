@@ -0,0 +1,55 @@
+# tests/test_voice_queue.py
+
+import threading
+import time
+
+import pytest
+
+from stream_slots import StreamSlots
+from voice_queue import QueueFull, VoiceJobQueue
+
+
+def test_queue_rejects_above_capacity_and_reports_position():
+    queue = VoiceJobQueue(workers=1, max_pending=1, result_ttl=60)
+    release = threading.Event()
+    running = queue.submit(lambda job: release.wait(5), "default")
+    while running.status == "queued":
+        time.sleep(0.01)
+    pending = queue.submit(lambda job: "ok", "default")
+    with pytest.raises(QueueFull) as exc:
+        queue.submit(lambda job: None, "default")
+    assert exc.value.retry_after >= 1
+    assert queue.position(pending) == 1
+
+    release.set()
+    assert running.wait(5) and pending.wait(5)
+    assert pending.status == "done" and pending.result == "ok"
+    assert queue.position(pending) == 0
+
+
+def test_job_error_is_recorded():
+    queue = VoiceJobQueue(workers=1, max_pending=0, result_ttl=60)
+    job = queue.submit(lambda job: 1 / 0, "default")
+    assert job.wait(5)
+    assert job.status == "error" and "division" in job.error
+
+
+def test_stream_slots_limit():
+    slots = StreamSlots(2)
+    assert slots.acquire() and slots.acquire()
+    assert not slots.acquire()
+    slots.release()
+    assert slots.acquire()
+
+
+def test_held_turns_share_capacity_with_submitted_jobs():
+    queue = VoiceJobQueue(workers=1, max_pending=1, result_ttl=60)
+    held, release = queue.hold("default")
+    assert held.wait_started(5)
+    pending = queue.submit(lambda job: "ok", "default")
+    with pytest.raises(QueueFull):
+        queue.hold("default")
+
+    release()
+    assert held.wait(5) and pending.wait(5)
+    assert pending.result == "ok"
@@ -0,0 +1,132 @@
+# transcripts.py
+
+import os
+import json
+import time
+import threading
+from collections import deque
+from typing import Optional
+
+
+def _tail_lines(path: str, count: int, block_size: int = 8192) -> list:
+    """Ostatnie `count` pełnych linii pliku — czyta od końca, blokami."""
+    if count <= 0 or not os.path.exists(path):
+        return []
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        data = b""
+        while position > 0 and data.count(b"\n") <= count:
+            step = min(block_size, position)
+            position -= step
+            f.seek(position)
+            data = f.read(step) + data
+    lines = [line for line in data.split(b"\n") if line.strip()]
+    if not data.endswith(b"\n") and lines:
+        lines.pop()  # niedokończony ostatni zapis
+    return lines[-count:]
+
+
+class TranscriptStore:
+    """
+    Historia rozmów: dziennik JSON Lines tylko do dopisywania + bufor ostatnich tur w pamięci.
+
+    Prompt potrzebuje kilku ostatnich wymian — bierzemy je z bufora (deque
+    o stałym rozmiarze), bez czytania pliku. Dziennik jest rotowany, gdy
+    przekroczy TRANSCRIPT_LOG_MAX_MB (plik.1, plik.2, …, najwyżej
+    TRANSCRIPT_LOG_BACKUPS kopii), a kopie starsze niż TRANSCRIPT_MAX_AGE_DAYS
+    są usuwane. Pamięć i dysk są więc ograniczone niezależnie od czasu działania.
+    """
+
+    def __init__(self, path: str, recent_size: int, max_bytes: int, backups: int, max_age_days: float,
+                 legacy_path: Optional[str] = None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.max_age_seconds = max_age_days * 86400
+        self.version = 0
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=recent_size)
+
+        if legacy_path and not os.path.exists(path) and os.path.exists(legacy_path):
+            self._import_legacy(legacy_path)
+        self._compact()
+        self._load_recent()
+
+    def _import_legacy(self, legacy_path: str) -> None:
+        """Jednorazowa migracja starego pliku JSON (jedna lista) do JSON Lines."""
+        try:
+            with open(legacy_path, "r", encoding="utf-8") as f:
+                history = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            history = []
+        entries = [e for e in history if isinstance(e, dict)] if isinstance(history, list) else []
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.path)
+        print(f"Migrated {len(entries)} transcript entries from {legacy_path} to {self.path}")
+
+    def _backup_path(self, n: int) -> str:
+        return f"{self.path}.{n}"
+
+    def _load_recent(self) -> None:
+        """Wypełnia bufor ogonem dziennika (i kolejnych kopii, jeśli dziennik jest świeżo zrotowany)."""
+        needed = self._recent.maxlen
+        lines = _tail_lines(self.path, needed)
+        n = 1
+        while len(lines) < needed and n <= self.backups:
+            lines = _tail_lines(self._backup_path(n), needed - len(lines)) + lines
+            n += 1
+        for line in lines:
+            try:
+                self._recent.append(json.loads(line))
+            except ValueError:
+                continue
+        self.version += 1
+
+    def _rotate(self) -> None:
+        for n in range(self.backups, 0, -1):
+            src = self.path if n == 1 else self._backup_path(n - 1)
+            if os.path.exists(src):
+                os.replace(src, self._backup_path(n))
+        self._compact()
+
+    def _compact(self) -> None:
+        """Usuwa kopie ponad limit i starsze niż TRANSCRIPT_MAX_AGE_DAYS."""
+        cutoff = time.time() - self.max_age_seconds
+        n = 1
+        while os.path.exists(self._backup_path(n)):
+            path = self._backup_path(n)
+            if n > self.backups or os.path.getmtime(path) < cutoff:
+                os.remove(path)
+            n += 1
+
+    def append(self, entry: dict) -> None:
+        line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            with open(self.path, "ab") as f:
+                f.write(line)
+                size = f.tell()
+            self._recent.append(entry)
+            self.version += 1
+            if size > self.max_bytes:
+                self._rotate()
+
+    def recent(self, count: int) -> list:
+        """`count` ostatnich tur z pamięci (od najstarszej)."""
+        with self._lock:
+            if count <= 0:
+                return []
+            return list(self._recent)[-count:]
+
+    def clear(self) -> None:
+        """Usuwa dziennik wraz z kopiami (nowa sesja)."""
+        with self._lock:
+            for path in [self.path] + [self._backup_path(n) for n in range(1, self.backups + 1)]:
+                if os.path.exists(path):
+                    os.remove(path)
+            self._recent.clear()
+            self.version += 1
+
@@ -0,0 +1,111 @@
+# tts_cache.py
+
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Iterator, Optional
+
+import config
+
+
+class TTSCache:
+    """
+    Cache wygenerowanej mowy na dysku, adresowany treścią.
+
+    Kluczem jest skrót SHA-256 z (tekst, model, głos, instrukcje, format),
+    więc ten sam tekst wypowiedziany tak samo generujemy tylko raz.
+    Łączny rozmiar plików jest ograniczony — przy przekroczeniu usuwamy
+    najdawniej używane (LRU, kolejność odtwarzana z mtime po restarcie).
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index = OrderedDict()
+        self._total = 0
+        os.makedirs(directory, exist_ok=True)
+        self._build_index()
+
+    @staticmethod
+    def key_for(text: str, model: str, voice: str, instructions: str, fmt: str) -> str:
+        raw = "\x1f".join((text, model, voice, instructions, fmt))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pcm")
+
+    def _build_index(self) -> None:
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".pcm"):
+                continue
+            st = os.stat(os.path.join(self.directory, name))
+            entries.append((st.st_mtime, name[:-4], st.st_size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._total += size
+
+    def _touch(self, key: str) -> bool:
+        """Oznacza wpis jako świeżo użyty; zwraca False, jeśli go nie ma."""
+        with self._lock:
+            if key not in self._index:
+                return False
+            self._index.move_to_end(key)
+        try:
+            os.utime(self._path(key))
+        except OSError:
+            return False
+        return True
+
+    def get(self, key: str) -> Optional[bytes]:
+        if not self._touch(key):
+            return None
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def iter_chunks(self, key: str, chunk_size: int = 4800) -> Optional[Iterator[bytes]]:
+        """Zwraca iterator kawałków zapisanego audio albo None, jeśli brak wpisu."""
+        if not self._touch(key):
+            return None
+        try:
+            f = open(self._path(key), "rb")
+        except OSError:
+            return None
+
+        def chunks():
+            with f:
+                while True:
+                    chunk = f.read(chunk_size)
+                    if not chunk:
+                        return
+                    yield chunk
+
+        return chunks()
+
+    def put(self, key: str, data: bytes) -> None:
+        if not data:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._total += len(data) - self._index.pop(key, 0)
+            self._index[key] = len(data)
+            while self._total > self.max_bytes and len(self._index) > 1:
+                old_key, size = self._index.popitem(last=False)
+                self._total -= size
+                try:
+                    os.remove(self._path(old_key))
+                except OSError:
+                    pass
+
+
+tts_cache = TTSCache(config.TTS_CACHE_DIR, max_bytes=config.TTS_CACHE_MAX_MB * 1024 * 1024)
@@ -3,12 +3,15 @@ import time
 
 import numpy as np
 import numpy.typing as npt
-import sounddevice as sd
 
 
 
 class AudioPlayer:
     def __enter__(self):
+        # Import dopiero przy odtwarzaniu na serwerze (PLAY_ON_BACKEND) — bez PortAudio
+        # (serwery bez karty dźwiękowej, kontenery) aplikacja i tak musi się uruchomić
+        import sounddevice as sd
+
         self.stream = sd.OutputStream(samplerate=24000, channels=1, dtype=np.int16)
         self.stream.start()
         return self
@@ -0,0 +1,65 @@
+# vad.py
+
+import numpy as np
+
+import config
+
+
+def trim_silence(audio: np.ndarray, sample_rate: int = 24000) -> tuple:
+    """
+    Prosta detekcja mowy na podstawie energii ramek (jedno przejście w numpy).
+
+    Ramka jest mową, jeśli jej poziom (dBFS) przekracza VAD_THRESHOLD_DB oraz
+    szacowany poziom szumu tła o VAD_NOISE_MARGIN_DB. Wokół mowy zostawiamy
+    VAD_PADDING_MS zapasu, więc cisza na początku i końcu jest ucinana,
+    a dłuższe pauzy skracane do 2 × VAD_PADDING_MS.
+
+    Zwraca (przycięte audio, statystyki).
+    """
+    audio = np.asarray(audio).reshape(-1)
+    original_seconds = audio.size / sample_rate
+    frame = max(1, int(sample_rate * config.VAD_FRAME_MS / 1000))
+    n_frames = audio.size // frame
+
+    if n_frames == 0:
+        return audio, _stats(original_seconds, original_seconds, speech_detected=audio.size > 0)
+
+    frames = audio[:n_frames * frame].astype(np.float32).reshape(n_frames, frame)
+    rms = np.sqrt(np.mean(np.square(frames), axis=1)) / 32768.0
+    level_db = 20.0 * np.log10(rms + 1e-10)
+
+    # Nagranie bez pauz (sama mowa) ma „szum tła” na poziomie mowy — dlatego
+    # próg adaptacyjny nie może przekroczyć poziomu najgłośniejszej ramki minus zapas
+    noise_floor_db = np.percentile(level_db, 10)
+    adaptive_db = min(noise_floor_db, level_db.max() - 2 * config.VAD_NOISE_MARGIN_DB) + config.VAD_NOISE_MARGIN_DB
+    threshold_db = max(config.VAD_THRESHOLD_DB, adaptive_db)
+    speech = level_db > threshold_db
+
+    if not speech.any():
+        return audio[:0], _stats(original_seconds, 0.0, speech_detected=False)
+
+    # Nagranie krótsze niż okno zapasu nie ma czego przycinać
+    pad = int(round(config.VAD_PADDING_MS / config.VAD_FRAME_MS))
+    kernel = 2 * pad + 1
+    if n_frames < kernel:
+        return audio, _stats(original_seconds, original_seconds, speech_detected=True)
+
+    # Rozszerzamy każdą ramkę mowy o zapas z obu stron (dylatacja; "full" + wycinek
+    # zawsze daje dokładnie n_frames wartości, niezależnie od długości jądra)
+    keep = np.convolve(speech.astype(np.int32), np.ones(kernel, dtype=np.int32), mode="full")[pad:pad + n_frames] > 0
+
+    mask = np.repeat(keep, frame)
+    trimmed = audio[:n_frames * frame][mask]
+    if keep[-1]:
+        trimmed = np.concatenate([trimmed, audio[n_frames * frame:]])
+
+    return trimmed, _stats(original_seconds, trimmed.size / sample_rate, speech_detected=True)
+
+
+def _stats(original_seconds: float, kept_seconds: float, speech_detected: bool) -> dict:
+    return {
+        "speech_detected": speech_detected,
+        "original_seconds": round(original_seconds, 2),
+        "kept_seconds": round(kept_seconds, 2),
+        "dropped_seconds": round(original_seconds - kept_seconds, 2),
+    }
@@ -0,0 +1,177 @@
+# vitals_analytics.py
+
+import threading
+import time
+from datetime import datetime
+from typing import Iterable, Optional
+
+import numpy as np
+
+import config
+from band_store import BandDataStore
+
+# Analizowane pola pomiaru (kolejność wierszy w tablicach i w _limits())
+METRICS = ("heart_rate", "spo2")
+
+
+def _limits() -> np.ndarray:
+    """Granice bezpiecznego zakresu jako tablica (metryka, [min, max])."""
+    return np.array([
+        [config.HR_MIN, config.HR_MAX],
+        [config.SPO2_MIN, np.inf],
+    ])
+
+
+def _timestamp(record: dict) -> float:
+    """Czas pomiaru: z urządzenia (measured_at), a bez niego — czas odbioru przez serwer."""
+    for field in ("measured_at", "received_at"):
+        value = record.get(field)
+        if isinstance(value, str):
+            try:
+                return datetime.fromisoformat(value).timestamp()
+            except ValueError:
+                continue
+    return time.time()
+
+
+def _number(value) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return np.nan
+    return float(value)
+
+
+def _round(value: float, digits: int = 2):
+    return None if not np.isfinite(value) else round(float(value), digits)
+
+
+class VitalsAnalytics:
+    """
+    Ostatnie pomiary z opaski w kolumnach numpy (bufor cykliczny).
+
+    Nowe pomiary trafiają do bufora przy zapisie (subskrypcja band_store).
+    summary() liczy dla wszystkich okien i parametrów naraz — jednym
+    przejściem na tablicach (okno × parametr × próbka) — średnie, min/max,
+    nachylenie trendu (na minutę), z-score ostatniego pomiaru i liczbę
+    przekroczeń zakresu. Braki danych to NaN.
+    """
+
+    def __init__(self, store: BandDataStore, capacity: int):
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._ts = np.zeros(capacity)
+        self._values = np.full((len(METRICS), capacity), np.nan)
+        self._falls = np.zeros(capacity, dtype=bool)
+        self._next = 0
+        self._count = 0
+
+        store.subscribe(self.add)
+        self.add(store.recent(capacity))
+
+    def add(self, records: Iterable[dict]) -> None:
+        records = list(records)[-self.capacity:]
+        if not records:
+            return
+        ts = np.array([_timestamp(r) for r in records])
+        values = np.array([[_number(r.get(m)) for r in records] for m in METRICS])
+        falls = np.array([bool(r.get("fall_detected", False)) for r in records])
+
+        with self._lock:
+            idx = (self._next + np.arange(len(records))) % self.capacity
+            self._ts[idx] = ts
+            self._values[:, idx] = values
+            self._falls[idx] = falls
+            self._next = (self._next + len(records)) % self.capacity
+            self._count = min(self.capacity, self._count + len(records))
+
+    def _snapshot(self):
+        """Kopia zawartości bufora w kolejności chronologicznej."""
+        with self._lock:
+            order = (self._next - self._count + np.arange(self._count)) % self.capacity
+            return self._ts[order], self._values[:, order], self._falls[order]
+
+    def summary(self, windows_minutes: Optional[Iterable[int]] = None, now: Optional[float] = None) -> dict:
+        if windows_minutes is None:
+            windows_minutes = config.VITALS_WINDOWS_MINUTES
+        # Okna rosnąco — sygnały trendu (_alerts) biorą pierwszy wiersz, czyli najkrótsze okno
+        windows = np.unique(np.asarray(list(windows_minutes), dtype=float))
+        if windows.size == 0 or windows[0] <= 0:
+            raise ValueError(f"Nieprawidłowe okna analizy (minuty): {list(windows_minutes)}")
+        now = time.time() if now is None else now
+        ts, values, falls = self._snapshot()
+        if ts.size == 0:
+            return {"samples": 0, "windows": {}, "latest": None, "alerts": []}
+
+        # Maski okien (W, N) i wartości (W, M, N); poza oknem lub brak pomiaru → nieważne
+        in_window = ts[None, :] >= now - windows[:, None] * 60.0
+        valid = in_window[:, None, :] & ~np.isnan(values)[None, :, :]
+        y = np.where(valid, values[None, :, :], 0.0)
+        x = np.broadcast_to((ts - now) / 60.0, y.shape)
+
+        n = valid.sum(axis=-1)
+        safe_n = np.maximum(n, 1)
+        mean = np.where(n > 0, y.sum(axis=-1) / safe_n, np.nan)
+        dy = np.where(valid, values[None] - mean[..., None], 0.0)
+        std = np.where(n > 1, np.sqrt((dy ** 2).sum(axis=-1) / np.maximum(n - 1, 1)), np.nan)
+
+        x_mean = np.where(valid, x, 0.0).sum(axis=-1) / safe_n
+        dx = np.where(valid, x - x_mean[..., None], 0.0)
+        sxx = (dx ** 2).sum(axis=-1)
+        slope = np.where((n > 1) & (sxx > 0), (dx * dy).sum(axis=-1) / np.where(sxx > 0, sxx, 1.0), np.nan)
+
+        minimum = np.where(n > 0, np.where(valid, values[None], np.inf).min(axis=-1), np.nan)
+        maximum = np.where(n > 0, np.where(valid, values[None], -np.inf).max(axis=-1), np.nan)
+
+        limits = _limits()
+        below = (valid & (values[None] < limits[None, :, 0, None])).sum(axis=-1)
+        above = (valid & (values[None] > limits[None, :, 1, None])).sum(axis=-1)
+        window_falls = (in_window & falls[None, :]).sum(axis=-1)
+
+        # Ostatni znany pomiar każdego parametru i jego z-score względem okna
+        has_value = ~np.isnan(values)
+        last_idx = np.where(has_value.any(axis=-1), values.shape[1] - 1 - np.argmax(has_value[:, ::-1], axis=-1), -1)
+        latest = np.array([values[m, i] if i >= 0 else np.nan for m, i in enumerate(last_idx)])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            z = np.where(std > 0, (latest[None, :] - mean) / std, np.nan)
+
+        result_windows = {}
+        for w, minutes in enumerate(windows.astype(int)):
+            stats = {}
+            for m, name in enumerate(METRICS):
+                stats[name] = {
+                    "n": int(n[w, m]),
+                    "mean": _round(mean[w, m], 1),
+                    "min": _round(minimum[w, m], 1),
+                    "max": _round(maximum[w, m], 1),
+                    "slope_per_min": _round(slope[w, m], 3),
+                    "z_latest": _round(z[w, m]),
+                    "below_range": int(below[w, m]),
+                    "above_range": int(above[w, m]),
+                }
+            stats["falls"] = int(window_falls[w])
+            result_windows[f"{minutes}m"] = stats
+
+        return {
+            "samples": int(ts.size),
+            "latest": {
+                "measured_at": datetime.fromtimestamp(ts[-1]).astimezone().isoformat(timespec="seconds"),
+                **{name: _round(latest[m], 1) for m, name in enumerate(METRICS)},
+                "fall_detected": bool(falls[-1]),
+            },
+            "windows": result_windows,
+            "alerts": self._alerts(latest, z),
+        }
+
+    @staticmethod
+    def _alerts(latest: np.ndarray, z: np.ndarray) -> list:
+        """
+        Sygnały trendu (deterministyczne, bez udziału LLM): ostatni pomiar mocno
+        odbiega od średniej najkrótszego okna (z[0], okna są posortowane). Przekroczenia zakresu i upadki
+        śledzi indeks anomalii (anomalies.py).
+        """
+        alerts = []
+        for m, name in enumerate(METRICS):
+            z_short = z[0, m]
+            if np.isfinite(z_short) and abs(z_short) >= config.VITALS_ZSCORE_THRESHOLD:
+                alerts.append({"metric": name, "value": _round(latest[m], 1), "z": _round(z_short, 1)})
+        return alerts
+
@@ -1,121 +1,97 @@
-from agents import Agent, function_tool
+from agents import Agent, function_tool, set_default_openai_client
 from agents.extensions.handoff_prompt import prompt_with_handoff_instructions
 from agents.voice import (
     AudioInput,
+    OpenAIVoiceModelProvider,
+    StreamedAudioInput,
     SingleAgentVoiceWorkflow,
     SingleAgentWorkflowCallbacks,
     VoicePipeline,
+    VoicePipelineConfig,
 )
-import requests
+import asyncio
+import logging
+from typing import AsyncContextManager, AsyncIterator, Awaitable, Callable, Optional
 import json
 import numpy as np
-import numpy.typing as npt
-import sounddevice as sd
 import config
-from notifications import append_notification
-
-
-class AudioPlayer:
-    def __enter__(self):
-        self.stream = sd.OutputStream(samplerate=24000, channels=1, dtype=np.int16)
-        self.stream.start()
-        return self
-
-    def __exit__(self, exc_type, exc_value, traceback):
-        self.stream.stop()  # wait for the stream to finish
-        self.stream.close()
-
-    def add_audio(self, audio_data: npt.NDArray[np.int16]):
-        self.stream.write(audio_data)
-
+from anomalies import compact_anomaly
+from residents import Resident, current_resident
+from reminders import get_reminders
+from async_runtime import async_openai
+from util import AudioPlayer
 
+# Wywołania narzędzi logujemy bez treści (dane zdrowotne podopiecznych nie trafiają do logów)
+log = logging.getLogger(__name__)
 
+# Agenci, STT i TTS korzystają z jednego klienta (i jednej puli połączeń)
+set_default_openai_client(async_openai)
 
 
 @function_tool
 def get_recent_band_data() -> str:
-    
-    count = 5
-    # Ścieżki plików
-    history_file = config.HISTORY_BAND_DATA_FILE
-
-    # Wczytanie JSON-a
+    """
+    Podsumowanie parametrów z opaski zamiast surowych pomiarów: ostatni
+    pomiar, statystyki okien (średnie, trend, z-score, przekroczenia),
+    sygnały trendu i niepotwierdzone anomalie.
+    """
+    resident = current_resident()
     try:
-        with open(history_file, "r", encoding="utf-8") as f:
-            history = json.load(f)
-        if not isinstance(history, list):
-            history = []
+        summary = resident.vitals.summary()
+        # Anomalie już zgłoszone opiekunowi są potwierdzone i tu nie wracają
+        summary["open_anomalies"] = [compact_anomaly(r) for r in resident.anomaly_index.unacknowledged()[-5:]]
     except Exception as e:
         return json.dumps({"error": f"Nie udało się odczytać historii: {e}"}, ensure_ascii=False)
 
-    recent = history[-count:]
-
-    # Uproszczenie struktury: przenosimy pola z każdego entry["data"]
-    simplified = []
-    for entry in recent:
-        record = entry
-        simplified.append(record)
-
-    print(f"[debug] get_recent_band_data: {simplified}")
-    return json.dumps(simplified, ensure_ascii=False)
+    log.debug("get_recent_band_data (resident %s)", resident.id)
+    return json.dumps(summary, ensure_ascii=False, separators=(",", ":"))
 
 
 @function_tool
-def get_calendar_events(query: str) -> str:
-    print(f"[debug] get_calendar_events called with query: {query}")
-    resp = requests.get(
-        "http://localhost:5000/api/reminders",
-        params={"n": 10}
-    )
-    resp.raise_for_status()
-    return resp.text
+async def get_calendar_events(query: str) -> str:
+    log.debug("get_calendar_events (resident %s)", current_resident().id)
+    # Wywołanie w procesie (bez pętli HTTP do własnego serwera); generowanie
+    # brakujących tekstów blokuje, więc robimy je poza pętlą asyncio
+    calendar = current_resident().calendar
+    if calendar is None:
+        return "This person has no calendar connected."
+    reminders = await asyncio.to_thread(get_reminders, 10, calendar)
+    return json.dumps(reminders, ensure_ascii=False)
 
 @function_tool
 def notify_event(description: str) -> str:
-    print(f"[debug] notify_event called with description: {description}")
-    append_notification(event="info", description=description)
+    log.debug("notify_event (resident %s)", current_resident().id)
+    current_resident().notifications.append(event="info", description=description)
     return "Event has been recorded in the event log."
 
 
 @function_tool
 def notify_caregiver(alert: str) -> str:
-    print(f"[debug] notify_caregiver called with alert: {alert}")
+    log.debug("notify_caregiver (resident %s)", current_resident().id)
 
-    append_notification(event="anomaly", description=alert)
-    
-    # Removing an anomaly that was introduced for testing purposes
-    history_file = config.HISTORY_BAND_DATA_FILE
+    resident = current_resident()
+    resident.notifications.append(event="anomaly", description=alert)
 
+    # Zgłoszone anomalie oznaczamy jako potwierdzone — historia pomiarów zostaje bez zmian
     try:
-        with open(history_file, "r", encoding="utf-8") as f:
-            history = json.load(f)
-        if not isinstance(history, list):
-            history = []
+        acknowledged = resident.health_monitor.acknowledge(note=alert)
     except Exception as e:
-        return f"Opiekun powiadomiony (błąd odczytu historii: {e})."
-
-    def is_anomaly(entry):
-        if entry.get("fall_detected", False):
-            return True
-        hr = entry.get("heart_rate")
-        if isinstance(hr, (int, float)) and (hr < 50 or hr > 120):
-            return True
-        sp = entry.get("spo2")
-        if isinstance(sp, (int, float)) and sp < 90:
-            return True
-        return False
-
-    original_len = len(history)
-    filtered = [e for e in history if not is_anomaly(e)]
-    removed = original_len - len(filtered)
+        return f"Opiekun powiadomiony (błąd zapisu potwierdzenia: {e})."
+
+    return f"Opiekun powiadomiony. Potwierdzono {acknowledged} anomalii."
 
+
+@function_tool
+def acknowledge_alerts(note: str) -> str:
+    log.debug("acknowledge_alerts (resident %s)", current_resident().id)
+
+    # Opiekun dostał już automatyczne powiadomienie przy zapisie pomiaru
     try:
-        with open(history_file, "w", encoding="utf-8") as f:
-            json.dump(filtered, f, ensure_ascii=False, indent=2)
+        acknowledged = current_resident().health_monitor.acknowledge(note=note)
     except Exception as e:
-        return f"Opiekun powiadomiony. Usunięto {removed} anomalii, ale błąd zapisu: {e}."
+        return f"Nie udało się potwierdzić alertów: {e}"
 
-    return f"Opiekun powiadomiony. Usunięto {removed} wpisów-anomalii z historii."
+    return f"Potwierdzono {acknowledged} anomalii."
 
 
 fun_agent = Agent(
@@ -138,23 +114,33 @@ as mental exercises for the user.
     tools=[notify_event],  # nie potrzebuje dodatkowych narzędzi
 )
 
-def build_main_agent():
-
-    with open("daily_routine_context.json", "r", encoding="utf-8") as f:
-        daily_routine = json.dumps(json.load(f), ensure_ascii=False, indent=2)
-    with open("proposed_medications.json", "r", encoding="utf-8") as f:
-        medications = json.dumps(json.load(f), ensure_ascii=False, indent=2)
+# ——————————————————————————————————————————————————————————
+# Cache promptu i agenta głównego (osobno dla każdego podopiecznego)
+# ——————————————————————————————————————————————————————————
+# Stała część promptu (rutyna dnia, leki) jest renderowana tylko wtedy,
+# gdy zmienią się pliki źródłowe (mtime/rozmiar — magazyny z watch=True).
+# Pamięć rozmowy (memory.py) i stan alertów są wklejane osobno, a Agent
+# budowany ponownie tylko przy zmianie promptu.
+
+
+def _render_static_prompt(resident: Resident) -> str:
+    daily_routine_data = resident.routine_store.read()
+    medications_data = resident.medications_store.read()
+    key = (resident.routine_store.version, resident.medications_store.version)
+    if resident.prompt_cache["key"] == key:
+        return resident.prompt_cache["text"]
+
+    # Zwięzły JSON (bez wcięć) — mniej tokenów w każdej turze
+    daily_routine = (
+        json.dumps(daily_routine_data, ensure_ascii=False, separators=(",", ":"))
+        if daily_routine_data else "No daily routine is on file for this person."
+    )
+    medications = (
+        json.dumps(medications_data, ensure_ascii=False, separators=(",", ":"))
+        if medications_data else "No medication list is on file for this person."
+    )
 
-    convo_file = config.TRANSCRIPT_HISTORY_FILE
-    try:
-        with open(convo_file, encoding="utf-8") as f:
-            convo = json.load(f)
-    except Exception:
-        convo = []
-    last_entries = convo[-5:]
-    history_json = json.dumps(last_entries, ensure_ascii=False, indent=2)
-
-    prompt = f"""
+    text = f"""
 You are a care assistant for elderly and disabled individuals.
 Always respond in a gentle, supportive tone in English.
 
@@ -164,39 +150,84 @@ Always respond in a gentle, supportive tone in English.
 
 • List of medications:
 {medications}
+"""
+    resident.prompt_cache.update(key=key, text=text)
+    return text
 
-— Conversation History (last 5 exchanges) —
-Each entry includes:
-- timestamp
-- input_transcript (what the user said)
-- output_transcript (your previous response)
 
-{history_json}
+_CALENDAR_RULE = (
+    "If the user asks about upcoming events, dates, or schedules, call **get_calendar_events** "
+    "and generate a helpful response based on the available events."
+)
+_NO_CALENDAR_RULE = (
+    "You have no access to this person's calendar. If the user asks about upcoming events, "
+    "say so gently and suggest asking the caregiver."
+)
 
+_MEDICATION_RULE = (
+    "Check which medications the user is taking and analyze whether the symptoms could be related to their treatment."
+)
+_NO_MEDICATION_RULE = (
+    "There is no medication list for this person. Do not guess which medications they take; "
+    "ask the caregiver to check their treatment."
+)
+
+_RULES_PROMPT = """
 — Dynamic Context and Rules of Conduct —
 
-1. At the start of each conversation (before generating your response), invoke **get_recent_band_data** and analyze the trend:
-   - If any measurement has `fall_detected=true` or if heart rate/SpO₂ values fall outside the safe range (heart rate < 50 or > 120, SpO₂ < 90%), immediately call **notify_caregiver** with a description of the concerning measurements. Inform the user that the caregiver has been notified.
+1. The **Current Health Alerts** section is kept up to date automatically from the band (falls, heart rate < {hr_min:g} or > {hr_max:g}, SpO₂ < {spo2_min:g}%, sudden changes). The caregiver has already been notified about every alert listed there:
+   - If it lists `open_anomalies` or `trend_alerts`, gently tell the user that the caregiver has been informed, ask how they feel, and then call **acknowledge_alerts** with a short note.
+   - Call **get_recent_band_data** only when the user asks about their measurements or you need trend details (window means, `slope_per_min`).
 
 2. If the user reports alarming symptoms (such as shortness of breath, chest pain, dizziness, headache, or fainting):
    - Immediately call **notify_caregiver** with an alert.
    - Log the reported symptoms by calling **notify_event** with an appropriate description, so that all health concerns are recorded.
-   - Check which medications the user is taking and analyze whether the symptoms could be related to their treatment.
+   - {medication_rule}
 
-3. If the user asks about upcoming events, dates, or schedules, call **get_calendar_events** and generate a helpful response based on the available events.
+3. {calendar_rule}
 
 4. If the user requests entertainment, a riddle, joke, a puzzle, or help solving a crossword clue, hand off the conversation to the **Fun** agent.
 
 5. In all other cases, respond gently: remind about medication, encourage hydration, rest, or suggest a short walk.
 """
 
-    return Agent(
-        name="Assistant",
-        instructions=prompt_with_handoff_instructions(prompt),
-        model="gpt-4o-mini",
-        tools=[notify_caregiver, get_calendar_events, get_recent_band_data, notify_event],
-        handoffs=[fun_agent],
-    )
+
+def build_main_agent(resident: Optional[Resident] = None):
+    resident = resident or current_resident()
+    with resident.agent_lock:
+        static_prompt = _render_static_prompt(resident)
+        alerts_version, alerts_context = resident.health_monitor.context()
+
+        key = (resident.prompt_cache["key"], resident.memory.version, alerts_version)
+        if resident.agent_cache["key"] == key:
+            return resident.agent_cache["agent"]
+
+        prompt = f"""{static_prompt}
+— Conversation Memory —
+{resident.memory.render()}
+
+— Current Health Alerts —
+{alerts_context}
+{_RULES_PROMPT.format(
+    hr_min=config.HR_MIN, hr_max=config.HR_MAX, spo2_min=config.SPO2_MIN,
+    calendar_rule=_CALENDAR_RULE if resident.calendar is not None else _NO_CALENDAR_RULE,
+    medication_rule=_MEDICATION_RULE if resident.medications_store.read() else _NO_MEDICATION_RULE,
+)}"""
+
+        tools = [notify_caregiver, acknowledge_alerts, get_recent_band_data, notify_event]
+        # Bez własnego kalendarza podopieczny nie dostaje narzędzia — nie zobaczy cudzych wydarzeń
+        if resident.calendar is not None:
+            tools.insert(2, get_calendar_events)
+
+        agent = Agent(
+            name="Assistant",
+            instructions=prompt_with_handoff_instructions(prompt),
+            model="gpt-4o-mini",
+            tools=tools,
+            handoffs=[fun_agent],
+        )
+        resident.agent_cache.update(key=key, agent=agent)
+        return agent
 
 
 class WorkflowCallbacks(SingleAgentWorkflowCallbacks):
@@ -206,35 +237,136 @@ class WorkflowCallbacks(SingleAgentWorkflowCallbacks):
 
     def on_run(self, workflow: SingleAgentVoiceWorkflow, transcription: str) -> None:
         self.transcription = transcription
-        print(f"[debug] on_run transcription: {transcription}")
+        log.debug("on_run: transcription of %d characters", len(transcription))
+
+
+class SessionVoiceWorkflow(SingleAgentVoiceWorkflow):
+    """
+    Workflow sesji wielu tur (StreamedAudioInput): po każdej turze przekazuje
+    transkrypcję wejścia i pełny tekst odpowiedzi do on_turn. admit() to
+    dopuszczenie tury (True/False) na czas jej trwania, np. miejsce w voice_queue;
+    tura niedopuszczona kończy się bez odpowiedzi.
+    """
+
+    def __init__(self, agent: Agent, on_turn: Callable[[dict], Awaitable[None]], callbacks=None,
+                 admit: Optional[Callable[[], AsyncContextManager[bool]]] = None):
+        super().__init__(agent, callbacks=callbacks)
+        self._on_turn = on_turn
+        self._admit = admit
+        self.idle = asyncio.Event()
+        self.idle.set()
+
+    async def run(self, transcription: str) -> AsyncIterator[str]:
+        self.idle.clear()
+        try:
+            if self._admit is None:
+                async for text in self._turn(transcription):
+                    yield text
+                return
+            async with self._admit() as admitted:
+                if not admitted:
+                    return
+                async for text in self._turn(transcription):
+                    yield text
+        finally:
+            self.idle.set()
+
+    async def _turn(self, transcription: str) -> AsyncIterator[str]:
+        parts = []
+        async for text in super().run(transcription):
+            parts.append(text)
+            yield text
+        await self._on_turn({"input_transcript": transcription, "output_transcript": "".join(parts)})
+
+
+def _build_pipeline(workflow: SingleAgentVoiceWorkflow) -> VoicePipeline:
+    return VoicePipeline(
+        workflow=workflow,
+        config=VoicePipelineConfig(
+            model_provider=OpenAIVoiceModelProvider(openai_client=async_openai)
+        ),
+    )
 
 
-async def voice_handler(audio: np.ndarray):
-    
+async def voice_handler_stream(audio: np.ndarray) -> AsyncIterator[dict]:
+    """
+    Uruchamia turę rozmowy i oddaje zdarzenia w miarę ich powstawania:
+    {"type": "audio", "data": int16 ndarray} dla kolejnych kawałków odpowiedzi,
+    a na końcu {"type": "transcript", "input_transcript", "output_transcript"}.
+    """
     callbacks = WorkflowCallbacks()
+    pipeline = _build_pipeline(SingleAgentVoiceWorkflow(build_main_agent(), callbacks=callbacks))
 
-    pipeline = VoicePipeline(
-        workflow=SingleAgentVoiceWorkflow(build_main_agent(), callbacks=callbacks)
-    )
-    
     audio_input = AudioInput(buffer=audio)
     result = await pipeline.run(audio_input)
-    
-    with AudioPlayer() as player:
+
+    async for event in result.stream():
+        if event.type == "voice_stream_event_audio":
+            yield {"type": "audio", "data": event.data}
+        elif event.type == "voice_stream_event_lifecycle":
+            print(f"Lifecycle: {event.event}")
+
+    yield {
+        "type": "transcript",
+        "output_transcript": result.total_output_text,
+        "input_transcript":  callbacks.transcription or "",
+    }
+
+
+async def voice_session_stream(
+    audio_input: StreamedAudioInput,
+    on_turn: Callable[[dict], Awaitable[None]],
+    stop: asyncio.Event,
+    admit: Optional[Callable[[], AsyncContextManager[bool]]] = None,
+) -> AsyncIterator[np.ndarray]:
+    """
+    Sesja rozmowy na żywo: mikrofon trafia do audio_input w trakcie mówienia,
+    STT z detekcją końca wypowiedzi działa po stronie OpenAI, a kawałki
+    odpowiedzi (int16 ndarray) są oddawane, gdy tylko powstaną. Transkrypcje
+    kolejnych tur trafiają do on_turn.
+
+    Po ustawieniu stop czekamy VOICE_SESSION_STOP_GRACE_SECONDS na ostatnią
+    wypowiedź i dokończenie bieżącej tury, a potem zamykamy STT; generator
+    kończy się po odtworzeniu reszty odpowiedzi. admit — patrz SessionVoiceWorkflow.
+    """
+    workflow = SessionVoiceWorkflow(build_main_agent(), on_turn, callbacks=WorkflowCallbacks(), admit=admit)
+    result = await _build_pipeline(workflow).run(audio_input)
+
+    async def _close_when_stopped():
+        await stop.wait()
+        await asyncio.sleep(config.VOICE_SESSION_STOP_GRACE_SECONDS)
+        await workflow.idle.wait()
+        result.text_generation_task.cancel()
+
+    closer = asyncio.create_task(_close_when_stopped())
+    try:
         async for event in result.stream():
             if event.type == "voice_stream_event_audio":
-                player.add_audio(event.data)
-                print("Received audio")
+                yield event.data
             elif event.type == "voice_stream_event_lifecycle":
                 print(f"Lifecycle: {event.event}")
-        # dodajemy 1 s ciszy na koniec
-        player.add_audio(np.zeros(24000 * 1, dtype=np.int16))
+    finally:
+        closer.cancel()
+        if not result.text_generation_task.done():
+            result.text_generation_task.cancel()
 
-    
-    text_response    = result.total_output_text
-    input_transcript = callbacks.transcription or ""
+
+async def voice_handler(audio: np.ndarray):
+    """Tura rozmowy z odtworzeniem odpowiedzi na karcie dźwiękowej serwera."""
+    ret = {}
+
+    # Zapis do karty dźwiękowej blokuje, więc robimy go poza wspólną pętlą
+    with AudioPlayer() as player:
+        async for event in voice_handler_stream(audio):
+            if event["type"] == "audio":
+                await asyncio.to_thread(player.add_audio, event["data"])
+                print("Received audio")
+            else:
+                ret = event
+        # dodajemy 1 s ciszy na koniec
+        await asyncio.to_thread(player.add_audio, np.zeros(24000 * 1, dtype=np.int16))
 
     return {
-        "output_transcript": text_response,
-        "input_transcript":  input_transcript
-    }
\ No newline at end of file
+        "output_transcript": ret.get("output_transcript", ""),
+        "input_transcript":  ret.get("input_transcript", "")
+    }
@@ -0,0 +1,195 @@
+# voice_queue.py
+
+import math
+import queue
+import threading
+import time
+import uuid
+import contextvars
+from collections import deque
+from typing import Any, Callable, Dict, Iterator, Optional
+
+import config
+
+# ——————————————————————————————————————————————————————————
+# Kolejka tur głosowych z własną pulą wątków
+# ——————————————————————————————————————————————————————————
+# Tura (STT → LLM → TTS, ewentualnie odtwarzanie na serwerze) trwa sekundy,
+# więc nie wykonuje się w wątku serwera HTTP — trafia do ograniczonej kolejki,
+# a obsługują ją VOICE_QUEUE_WORKERS wątki. Wątki serwera zostają wolne dla
+# lekkich tras (/api/band_data, /api/notifications). Gdy w kolejce czeka już
+# VOICE_QUEUE_MAX_PENDING tur, nowa jest odrzucana (QueueFull → HTTP 429)
+# zamiast czekać bez końca.
+#
+# Zadanie wykonuje się w kopii kontekstu zlecającego (contextvars), więc
+# podopieczny żądania (residents.current_resident) jest widoczny także w tle.
+#
+# Tury sesji na żywo (voice_session.py) działają na pętli asyncio, ale też
+# przechodzą przez tę kolejkę: hold() zajmuje wątek puli na czas tury, więc
+# obie ścieżki dzielą te same limity.
+
+_END = object()
+
+
+class QueueFull(Exception):
+    """Kolejka tur jest pełna; retry_after — sugerowany czas ponowienia (s)."""
+
+    def __init__(self, pending: int, retry_after: int):
+        super().__init__(f"Kolejka tur głosowych jest pełna ({pending} oczekujących)")
+        self.pending = pending
+        self.retry_after = retry_after
+
+
+class VoiceJob:
+    """Jedna tura w kolejce: stan, wynik i strumień zdarzeń (dla ?stream=1)."""
+
+    def __init__(self, fn: Callable[["VoiceJob"], Any], resident_id: str):
+        self.id = uuid.uuid4().hex
+        self.resident_id = resident_id
+        self.status = "queued"  # queued → running → done / error
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._fn = fn
+        self._context = contextvars.copy_context()
+        self._events: "queue.Queue[Any]" = queue.Queue()
+        self._started = threading.Event()
+        self._done = threading.Event()
+
+    def emit(self, event: Any) -> None:
+        """Przekazuje zdarzenie (np. kawałek audio) czytelnikowi events()."""
+        self._events.put(event)
+
+    def events(self) -> Iterator[Any]:
+        """Zdarzenia zadania w kolejności emisji, aż do jego zakończenia."""
+        while True:
+            event = self._events.get()
+            if event is _END:
+                return
+            yield event
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    def wait_started(self, timeout: Optional[float] = None) -> bool:
+        """Czeka, aż zadanie dostanie wątek z puli (wyjdzie z kolejki)."""
+        return self._started.wait(timeout)
+
+    def _run(self) -> None:
+        self.status = "running"
+        self.started_at = time.time()
+        self._started.set()
+        try:
+            self.result = self._context.run(self._fn, self)
+            self.status = "done"
+        except Exception as e:
+            self.error = str(e)
+            self.status = "error"
+        finally:
+            self.finished_at = time.time()
+            self._events.put(_END)
+            self._done.set()
+
+
+class VoiceJobQueue:
+    def __init__(self, workers: int, max_pending: int, result_ttl: float):
+        self.workers = max(1, workers)
+        self.max_pending = max(0, max_pending)
+        self.result_ttl = result_ttl
+        self._cond = threading.Condition()
+        self._pending: deque = deque()
+        self._jobs: Dict[str, VoiceJob] = {}
+        self._running = 0
+        self._threads: list = []
+        # Średni czas tury (wygładzany) — do nagłówka Retry-After
+        self._avg_seconds = 5.0
+
+    def _ensure_workers(self) -> None:
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._worker, name=f"voice-queue-{len(self._threads)}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.result_ttl
+        for job_id in [i for i, j in self._jobs.items() if j.finished_at and j.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+    def retry_after(self) -> int:
+        with self._cond:
+            waves = (len(self._pending) + self._running) / self.workers
+            return max(1, math.ceil(self._avg_seconds * waves))
+
+    def submit(self, fn: Callable[[VoiceJob], Any], resident_id: str) -> VoiceJob:
+        """Dodaje turę do kolejki; QueueFull, gdy wszystkie wątki są zajęte i czeka już max_pending tur."""
+        with self._cond:
+            self._prune()
+            if self._running + len(self._pending) >= self.workers + self.max_pending:
+                raise QueueFull(len(self._pending), self.retry_after())
+            job = VoiceJob(fn, resident_id)
+            self._jobs[job.id] = job
+            self._pending.append(job)
+            self._ensure_workers()
+            self._cond.notify()
+            return job
+
+    def hold(self, resident_id: str) -> tuple:
+        """
+        Miejsce w puli dla tury wykonywanej poza nią: zadanie trzyma wątek, aż
+        wywołamy zwróconą funkcję release. Zwraca (job, release); QueueFull jak submit.
+        """
+        released = threading.Event()
+        job = self.submit(lambda _job: released.wait(), resident_id)
+        return job, released.set
+
+    def get(self, job_id: str) -> Optional[VoiceJob]:
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def position(self, job: VoiceJob) -> int:
+        """Miejsce w kolejce (1 = następna do wykonania); 0, gdy tura już trwa lub się skończyła."""
+        with self._cond:
+            try:
+                return self._pending.index(job) + 1
+            except ValueError:
+                return 0
+
+    def describe(self, job: VoiceJob) -> dict:
+        info = {"job_id": job.id, "status": job.status, "position": self.position(job)}
+        if job.status == "done":
+            info["result"] = job.result
+        elif job.status == "error":
+            info["error"] = job.error
+        return info
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "workers": self.workers,
+                "running": self._running,
+                "pending": len(self._pending),
+                "max_pending": self.max_pending,
+            }
+
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                job = self._pending.popleft()
+                self._running += 1
+            try:
+                job._run()
+            finally:
+                with self._cond:
+                    self._running -= 1
+                    self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * (job.finished_at - job.started_at)
+
+
+voice_queue = VoiceJobQueue(
+    workers=config.VOICE_QUEUE_WORKERS,
+    max_pending=config.VOICE_QUEUE_MAX_PENDING,
+    result_ttl=config.VOICE_JOB_RESULT_TTL_SECONDS,
+)
@@ -0,0 +1,172 @@
+# voice_session.py
+
+import asyncio
+import logging
+import threading
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, Optional
+
+import numpy as np
+from agents.voice import StreamedAudioInput
+from flask import request
+from flask_socketio import SocketIO
+
+import async_runtime
+import config
+import residents
+from audio_decode import decode_raw_pcm, parse_sample_rate
+from stream_slots import stream_slots
+from voice_agents import voice_session_stream
+from voice_queue import QueueFull, voice_queue
+
+log = logging.getLogger(__name__)
+
+# ——————————————————————————————————————————————————————————
+# Sesja głosowa na żywo przez WebSocket (Socket.IO)
+# ——————————————————————————————————————————————————————————
+# Przeglądarka wysyła paczki PCM (int16, 24 kHz, mono) już w trakcie mówienia,
+# a serwer przekazuje je do StreamedAudioInput — transkrypcja i wykrywanie
+# końca wypowiedzi trwają równolegle z nagrywaniem. Odpowiedź wraca jako
+# binarne paczki PCM ("voice_audio"), a po każdej turze "voice_transcript".
+# Każda tura zajmuje miejsce w voice_queue (te same limity co /api/voice):
+# przy pełnej kolejce tura jest pomijana z "voice_error" (retry_after).
+#
+# Zdarzenia klienta: voice_start ({rate, resident}), voice_audio (bytes), voice_stop.
+# Zdarzenia serwera: voice_audio, voice_transcript, voice_error, voice_ended.
+
+socketio = SocketIO(async_mode="threading", cors_allowed_origins="*")
+
+_sessions: Dict[str, "VoiceSession"] = {}
+_sessions_lock = threading.Lock()
+# Połączenia, które zajęły miejsce w stream_slots (zwalniane przy rozłączeniu)
+_slot_sids = set()
+_on_transcript: Optional[Callable[[dict], None]] = None
+
+
+class VoiceSession:
+    def __init__(self, sid: str, sample_rate: int):
+        # Tworzona w use_resident(...) — submit kopiuje kontekst, więc cała sesja
+        # (narzędzia, prompt, zapis transkrypcji) działa na stanie tego podopiecznego
+        self.sid = sid
+        self.sample_rate = sample_rate
+        self._loop = async_runtime.get_loop()
+        self._input = StreamedAudioInput()
+        self._stop = asyncio.Event()
+        self.future = async_runtime.submit(self._run())
+
+    def add_audio(self, data: bytes) -> None:
+        pcm = decode_raw_pcm(data, self.sample_rate)
+        if pcm.size:
+            # put_nowait przez call_soon_threadsafe zachowuje kolejność paczek
+            self._loop.call_soon_threadsafe(self._input.queue.put_nowait, pcm)
+
+    def stop(self) -> None:
+        self._loop.call_soon_threadsafe(self._stop.set)
+
+    def _emit(self, event: str, data=None) -> None:
+        socketio.emit(event, data, to=self.sid)
+
+    async def _on_turn(self, turn: dict) -> None:
+        log.debug("Voice session %s: turn done (resident %s)", self.sid, residents.current_resident().id)
+        if _on_transcript is not None:
+            await asyncio.to_thread(_on_transcript, turn)
+        await asyncio.to_thread(self._emit, "voice_transcript", turn)
+
+    @asynccontextmanager
+    async def _admit_turn(self):
+        try:
+            job, release = voice_queue.hold(residents.current_resident().id)
+        except QueueFull as e:
+            await asyncio.to_thread(self._emit, "voice_error", {
+                "error": "Asystent prowadzi teraz inne rozmowy — spróbuj ponownie za chwilę",
+                "retry_after": e.retry_after,
+            })
+            yield False
+            return
+        try:
+            await asyncio.to_thread(job.wait_started)
+            yield True
+        finally:
+            release()
+
+    async def _run(self) -> None:
+        try:
+            async for audio in voice_session_stream(self._input, self._on_turn, self._stop, admit=self._admit_turn):
+                pcm = np.asarray(audio, dtype=np.int16).tobytes()
+                await asyncio.to_thread(self._emit, "voice_audio", pcm)
+        except Exception as e:
+            await asyncio.to_thread(self._emit, "voice_error", {"error": f"Sesja głosowa przerwana: {e}"})
+        finally:
+            with _sessions_lock:
+                if _sessions.get(self.sid) is self:
+                    del _sessions[self.sid]
+            await asyncio.to_thread(self._emit, "voice_ended")
+
+
+def _stop_session(sid: str) -> None:
+    with _sessions_lock:
+        session = _sessions.get(sid)
+    if session is not None:
+        session.stop()
+
+
+@socketio.on("connect")
+def on_connect(*args):
+    # Połączenie WebSocket zajmuje wątek serwera — ponad limit odmawiamy
+    if not stream_slots.acquire():
+        raise ConnectionRefusedError("Zbyt wiele otwartych połączeń — spróbuj ponownie za chwilę")
+    with _sessions_lock:
+        _slot_sids.add(request.sid)
+
+
+@socketio.on("voice_start")
+def on_voice_start(data=None):
+    sid = request.sid
+    data = data or {}
+    try:
+        sample_rate = parse_sample_rate(data.get("rate", 24000))
+    except ValueError as e:
+        socketio.emit("voice_error", {"error": str(e)}, to=sid)
+        return
+    resident_id = data.get("resident") or config.DEFAULT_RESIDENT_ID
+    if not residents.is_valid_id(resident_id) or not residents.is_known(resident_id):
+        socketio.emit("voice_error", {"error": f"Nieznany podopieczny: {resident_id}"}, to=sid)
+        return
+    if not residents.is_served_here(resident_id):
+        socketio.emit("voice_error", {"error": f"Podopieczny {resident_id} nie jest obsługiwany przez ten proces"}, to=sid)
+        return
+    _stop_session(sid)
+    with residents.use_resident(resident_id), _sessions_lock:
+        _sessions[sid] = VoiceSession(sid, sample_rate)
+
+
+@socketio.on("voice_audio")
+def on_voice_audio(data):
+    with _sessions_lock:
+        session = _sessions.get(request.sid)
+    if session is not None and isinstance(data, (bytes, bytearray)):
+        session.add_audio(bytes(data))
+
+
+@socketio.on("voice_stop")
+def on_voice_stop():
+    _stop_session(request.sid)
+
+
+@socketio.on("disconnect")
+def on_disconnect(*args):
+    # Bieżąca tura kończy się normalnie (i trafia do historii), dalsze audio nie ma odbiorcy
+    _stop_session(request.sid)
+    with _sessions_lock:
+        holds_slot = request.sid in _slot_sids
+        _slot_sids.discard(request.sid)
+    if holds_slot:
+        stream_slots.release()
+
+
+def init_app(app, on_transcript: Optional[Callable[[dict], None]] = None) -> SocketIO:
+    """Podpina Socket.IO do aplikacji; on_transcript zapisuje transkrypcję każdej tury."""
+    global _on_transcript
+    _on_transcript = on_transcript
+    socketio.init_app(app)
+    return socketio
@@ -0,0 +1,53 @@
+# wsgi.py
+
+from dotenv import load_dotenv
+
+# Zmienne z .env muszą być ustawione przed wczytaniem config
+load_dotenv()
+
+import config
+from app import app, socketio
+from reminder_scheduler import reminder_scheduler
+
+# ——————————————————————————————————————————————————————————
+# Serwer produkcyjny
+# ——————————————————————————————————————————————————————————
+#   gunicorn -w 1 --threads 32 -b 0.0.0.0:5000 wsgi:app
+# albo po prostu:
+#   python wsgi.py   (to samo, z SERVER_HOST / SERVER_PORT / SERVER_THREADS)
+#
+# Wątki serwera obsługują tylko lekkie trasy i strumienie (SSE, Socket.IO) —
+# tury /api/voice wykonuje osobna pula kolejki (voice_queue.py). Stan
+# podopiecznych (bufory pomiarów, powiadomienia, sesje) żyje w procesie,
+# dlatego proces ma jednego workera; kolejne procesy uruchamiamy z
+# WORKER_SHARD=i/n (każdy na swoim porcie) za proxy, które kieruje żądania
+# po X-Resident-Id / ?resident=.
+
+# Każdy proces wysyła przypomnienia z kalendarzy swoich podopiecznych
+if config.REMINDER_SCHEDULER_ENABLED:
+    reminder_scheduler.start()
+
+
+def serve() -> None:
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        print("gunicorn nie jest zainstalowany — uruchamiam serwer wbudowany (nie do produkcji)")
+        socketio.run(app, host=config.SERVER_HOST, port=config.SERVER_PORT, allow_unsafe_werkzeug=True)
+        return
+
+    class _Server(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", f"{config.SERVER_HOST}:{config.SERVER_PORT}")
+            self.cfg.set("workers", 1)
+            self.cfg.set("worker_class", "gthread")
+            self.cfg.set("threads", config.SERVER_THREADS)
+
+        def load(self):
+            return app
+
+    _Server().run()
+
+
+if __name__ == "__main__":
+    serve()